@@ -0,0 +1,463 @@
+'''
+GW Alembic saver - BATCH
+Exports the sets of many scenes without opening Maya by hand.
+Scenes are spread over a pool of "mayapy" worker processes (Maya starts once per
+worker, each one exports its share of the scenes), every worker runs the same
+export / back-up / log path as the dialog (gw_alembic_core.exportSets)
+
+USAGE
+    mayapy gw_alembic_batch.py -o /proj/exports/abc -s "*:geo_cache_set" shot010.ma shot020.ma
+    python gw_alembic_batch.py --workers 4 --mayapy /usr/autodesk/maya2024/bin/mayapy ...
+
+If no output folder is given, every scene writes to "exports/abc" of the project.
+Workers talk to the parent with lines starting with "GWBATCH " followed by JSON.
+
+With "--chunks N" every scene is exported by N workers at the same time, each
+one writing a part of the frame range (see exportSetsSharded)
+'''
+
+import argparse
+import fnmatch
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import gw_alembic_core as core
+
+message_prefix = "GWBATCH "
+
+################################################################################
+def matchSets(user_sets, set_patterns):
+    """ Sets matching ANY of the patterns (fnmatch, "*:geo_cache_set"), scene order
+    """
+    return [name for name in user_sets if any(fnmatch.fnmatchcase(name, p) for p in set_patterns)]
+
+def sendMessage(message, stream=None):
+    # one JSON line per message, the parent reads them from stdout
+    stream = stream or sys.stdout
+    stream.write(message_prefix+json.dumps(message)+"\n")
+    stream.flush()
+
+def exportScene(scene, set_patterns, output=None, notes="", options=None, report=None, chunks=1, handles=0, mayapy=None):
+    """ Open ONE scene and export the sets matching the patterns.
+    Runs inside the worker (or in process, with a stub core.cmds for tests).
+    With "chunks" > 1 the frame range is split over that many workers (exportSetsSharded)
+    Returns a dict: scene, sets, failed, problems, error
+    """
+    options = options or {}
+    report = report or (lambda message: None)
+    result = {"scene": scene, "sets": [], "failed": [], "problems": {}, "error": None}
+    try:
+        report({"scene": scene, "status": "opening"})
+        core.cmds.file(scene, open=True, force=True)
+        core.loadAbcExportPlugin()
+        sets_to_export = matchSets(core.getUserSets(), set_patterns)
+        result["sets"] = sets_to_export
+        if not sets_to_export:
+            result["error"] = "No sets matching: "+", ".join(set_patterns)
+            return result
+        exportsSubdirectory = output or core.getDefaultExportsDirectory()
+        report({"scene": scene, "status": "exporting", "sets": sets_to_export})
+        if chunks > 1:
+            options = dict(options)
+            for option in ["batch_export", "static_once", "static_samples", "scratch_directory", "dedupe"]:
+                options.pop(option, None)
+            result["failed"] = exportSetsSharded(sets_to_export, exportsSubdirectory, chunks, handles, notes=notes, report=report,
+                                                 problems=result["problems"], mayapy=mayapy, **options)
+        else:
+            result["failed"] = core.exportSets(sets_to_export, exportsSubdirectory, notes=notes, problems=result["problems"], **options)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def workerMain(args):
+    """ Worker process: start Maya standalone, export every scene given, report back
+    """
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    import maya.cmds
+    core.cmds = maya.cmds
+    # everything printed by Maya goes to stderr, stdout is for the parent
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    options = getExportOptions(args)
+    results = []
+    for scene in args.scenes:
+        result = exportScene(scene, args.sets, args.output, args.notes, options, report=lambda m: sendMessage(m, stdout),
+                             chunks=args.chunks, handles=args.handles, mayapy=args.mayapy)
+        result["status"] = "done"
+        if args.scratch:
+            results.append(result) # done when its transfers are
+        else:
+            sendMessage(result, stdout)
+    if args.scratch and core.publishers:
+        # the scenes are saved only when their files are on the share
+        sendMessage({"scene": ", ".join(args.scenes), "status": "waiting for transfers"}, stdout)
+        for status in core.getPublisher(args.scratch).wait():
+            for result in results:
+                if status["set"] in result["sets"] and status["set"] not in result["failed"]:
+                    result["failed"].append(status["set"])
+                    result["problems"][status["set"]] = ["Transfer "+status["state"]+": "+str(status["error"])]
+    for result in results:
+        sendMessage(result, stdout)
+    maya.standalone.uninitialize()
+
+################################################################################
+# Frame range sharding: ONE scene, its frame range split over many workers
+
+def runChunkJobs(chunk_jobs, frames=0, evaluation_mode=None):
+    """ Exports the jobs of ONE chunk (all sets) in one AbcExport call.
+    Scene already open. Returns {set: True/False}
+    """
+    with core.FastBake(frames, evaluation_mode):
+        return core.exportAlembicJobsBatched(chunk_jobs)
+
+def chunkWorkerMain(args):
+    """ Worker process of a sharded export: open the scene, export one chunk, report back
+    """
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    import maya.cmds
+    core.cmds = maya.cmds
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    with open(args.chunk_jobs) as jobs_file:
+        chunk = json.load(jobs_file)
+    message = {"scene": args.scenes[0], "chunk": chunk["chunk"], "status": "done", "results": {}, "error": None}
+    try:
+        core.cmds.file(args.scenes[0], open=True, force=True)
+        core.loadAbcExportPlugin()
+        frames = chunk["written"][1]-chunk["written"][0]+1
+        message["results"] = runChunkJobs(chunk["jobs"], frames, args.evaluation)
+    except Exception as e:
+        message["error"] = str(e)
+    sendMessage(message, stdout)
+    maya.standalone.uninitialize()
+
+def launchChunkWorker(scene, chunk, chunk_jobs, report, mayapy=None, evaluation_mode=None):
+    """ Run ONE chunk in its own mayapy process. Returns {set: True/False}
+    """
+    handle, jobs_name = tempfile.mkstemp(prefix="gw_chunk_", suffix=".json")
+    with os.fdopen(handle, "w") as jobs_file:
+        json.dump(dict(chunk, jobs=chunk_jobs), jobs_file)
+    command = [mayapy or getMayapy(), os.path.abspath(__file__), "--chunk-jobs", jobs_name]
+    if evaluation_mode:
+        command += ["--evaluation", evaluation_mode]
+    results = {}
+    try:
+        process = subprocess.Popen(command+[scene], stdout=subprocess.PIPE, universal_newlines=True)
+        for line in process.stdout:
+            if line.startswith(message_prefix):
+                message = json.loads(line[len(message_prefix):])
+                if message.get("error"):
+                    report({"scene": scene, "status": "chunk "+str(chunk["chunk"])+" ERROR: "+message["error"]})
+                results = message.get("results", {})
+        process.wait()
+    finally:
+        os.remove(jobs_name)
+    return results
+
+def exportSetsSharded(sets_to_export, exportsSubdirectory, chunks, handles=0, workers=None, notes="", launcher=None, report=None,
+                      namespaces_only=True, export_only_visible=True, collapse_roots=False, force=False, evaluation_mode=None,
+                      problems=None, mayapy=None, profile=None):
+    """ Same as gw_alembic_core.exportSets, but the frame range is split in "chunks"
+    exported at the same time by headless workers ("workers" at most, default: one
+    per chunk). Each set gets one file per chunk and a manifest that lists them in
+    order: <name>/<name>_vNNN.manifest.json, published as <name>.manifest.json
+    The SAVED scene is exported: workers open it from disk.
+    "launcher(scene, chunk, chunk_jobs, report)" runs one chunk and returns
+    {set: True/False}, replace it to run in process (tests, stub exporter).
+    "profile": name of the export profile, the chunks use its flags and step.
+    Returns the list of sets NOT saved.
+    """
+    cmds = core.cmds
+    report = report or printMessage
+    scene_path = cmds.file(q=True, sceneName=True)
+    if cmds.file(q=True, modified=True):
+        raise RuntimeError("Save the scene first, the workers export the scene on disk")
+    if launcher is None:
+        launcher = lambda scene, chunk, chunk_jobs, report: launchChunkWorker(scene, chunk, chunk_jobs, report, mayapy, evaluation_mode)
+    user = core.getpass.getuser()
+    host = core.socket.gethostname()
+    notes = core.cleanNotes(notes)
+    profile = core.getExportProfile(profile)
+    exportsSubdirectory = core.getProfileDirectory(exportsSubdirectory, profile)
+    start, end = core.getFrameRange()
+    frames_per_second = cmds.currentUnit(query=True, time=True)
+    ranges = core.splitFrameRange(start, end, chunks, handles, profile["step"])
+
+    timer = core.StageTimer()
+    jobs = core.buildExportJobs(sets_to_export, exportsSubdirectory, start, end, namespaces_only, export_only_visible, collapse_roots, force,
+                                timer=timer, profile=profile,
+                                fingerprint_options="sharded "+str(len(ranges))+" chunks handles "+str(handles)+" ")
+    valid_jobs = [job for job in jobs if not job["errors"] and not job["reused"]]
+    chunk_files = {} # set -> chunk files, in order
+    chunk_jobs = []
+    for chunk in ranges:
+        chunk_jobs.append([])
+        for job in valid_jobs:
+            chunk_file = core.getChunkFileName(job["version_name"], chunk["chunk"])
+            chunk_files.setdefault(job["set"], []).append(chunk_file)
+            chunk_jobs[-1].append({"set": job["set"], "version_name": chunk_file,
+                                   "command": core.buildAlembicCommand(job["roots"], chunk_file, chunk["written"][0], chunk["written"][1],
+                                                                      job["profile"])})
+
+    # run the chunks, every set must have ALL its chunks. The hooks (profilers)
+    # see this process waiting for the workers, not the workers themselves
+    results = dict((job["set"], True) for job in valid_jobs)
+    with timer.stage("abc_export"), core.exportHooks(valid_jobs):
+        if valid_jobs:
+            def run(index):
+                report({"scene": scene_path, "status": "chunk "+str(ranges[index]["chunk"])+" frames "+str(ranges[index]["written"])})
+                return launcher(scene_path, ranges[index], chunk_jobs[index], report)
+            with ThreadPoolExecutor(max_workers=max(1, workers or len(ranges))) as pool:
+                for chunk_results in pool.map(run, range(len(ranges))):
+                    for job in valid_jobs:
+                        results[job["set"]] = results[job["set"]] and bool(chunk_results.get(job["set"]))
+    seconds = timer.stages["abc_export"]["wall"]
+
+    # telemetry: bytes of all the chunks, the CPU of the workers is not counted
+    set_bytes = dict((currentSet, sum(os.path.getsize(name) for name in chunk_files[currentSet] if os.path.exists(name)))
+                     for currentSet in chunk_files)
+    context = {"export_id": core.getExportId(), "user": user, "host": host, "maya": cmds.about(installedVersion=True),
+               "scene": scene_path, "project": cmds.workspace(q=True, fn=True), "mode": "sharded", "chunks": len(ranges),
+               "handles": handles, "evaluation": evaluation_mode or "scene", "start": start, "end": end,
+               "frames": core.getProfileFrames(start, end, profile), "fps": frames_per_second, "notes": notes, "profile": profile["name"]}
+    pass_stats = {"sets": len(valid_jobs), "stages": timer.stages,
+                  "bytes": sum(set_bytes[currentSet] for currentSet in set_bytes if results.get(currentSet))}
+
+    sets_not_saved_to_alembic = []
+    catalog_entries = []
+    for job in jobs:
+        currentSet = job["set"]
+        saved = job["reused"] or results.get(currentSet, False)
+        manifest_save_name = job["save_name"][:-len(".abc")]+".manifest.json"
+        retired = []
+        if job["reused"]:
+            # published again: an export in between may have replaced the latest files
+            try:
+                if not (os.path.exists(manifest_save_name) and os.path.samefile(job["version_name"], manifest_save_name)):
+                    core.publishAlembic(job["version_name"], manifest_save_name)
+                retired = core.retireLatestFiles(manifest_save_name)
+            except (OSError, IOError) as e:
+                saved = False
+                cmds.warning("Failed to publish Alembic of :"+currentSet+" "+str(e))
+        lines = [
+            "Set: "+currentSet+" Version:"+(job["version"] if saved else "N/A"),
+            "User name: "+user+" Machine: "+host,
+            "Maya build: "+cmds.about(installedVersion=True),
+            "Starf frame: "+str(start)+" End frame: "+str(end)+" Frames per second: "+str(frames_per_second),
+            "Project located at: "+cmds.workspace(q=True, fn=True),
+            "original Maya file: "+scene_path.split('/')[-1],
+            "Original Full path:"+scene_path,
+            "Profile: "+core.getProfileReport(profile),
+            "Export mode: sharded ("+str(len(ranges))+" chunks, handles "+str(handles)+") in "+"%.1f" % seconds+" s",
+        ]
+        if job["reused"]:
+            lines.append("Unchanged since last export (same fingerprint): reused "+job["version"])
+            if saved:
+                lines.append("Manifest          :"+job["version_name"])
+                lines.extend(retired)
+        elif job["errors"]:
+            lines.append("WARNING : REJECTED BY PRE-FLIGHT CHECK, ALEMBIC NOT EXPORTED")
+            lines.extend("PRE-FLIGHT error: "+error for error in job["errors"])
+            if problems is not None:
+                problems[currentSet] = job["errors"]
+        elif saved:
+            manifest_name = job["version_name"][:-len(".abc")]+".manifest.json"
+            core.writeChunkManifest(manifest_name, currentSet, job["version"], ranges, chunk_files[currentSet],
+                                    start, end, frames_per_second, handles, scene_path)
+            core.publishAlembic(manifest_name, manifest_save_name)
+            lines.append("Manifest          :"+manifest_name)
+            # the <name>.abc of an earlier export is not the latest any more
+            lines.extend(core.retireLatestFiles(manifest_save_name))
+            core.writeFingerprint(job["directory"], job["file_name"], currentSet, job["fingerprint"], job["version"], manifest_name)
+            # the manifest has the sha256 of every chunk
+            sha256 = core.getFileHash(manifest_name)
+            lines.append("Checksum: "+os.path.basename(manifest_name)+" sha256 "+sha256)
+            catalog_entries.append(dict(core.getCatalogEntry(job, manifest_name, manifest_save_name, start, end,
+                                                             frames_per_second, scene_path, user, host, notes, sha256),
+                                        size=set_bytes.get(currentSet, 0)))
+            for chunk, chunk_file in zip(ranges, chunk_files[currentSet]):
+                lines.append("Chunk "+str(chunk["chunk"]).zfill(2)+" frames "+str(chunk["frames"])+" written "+str(chunk["written"])+" :"+chunk_file)
+        else:
+            lines.append("WARNING : FAILED TO SAVE ALEMBIC FILE (one or more chunks failed)")
+            for chunk_file in chunk_files.get(currentSet, []):
+                if os.path.exists(chunk_file):
+                    os.remove(chunk_file)
+        lines.append("Timing (s): "+core.getTimingReport(job["stages"])+" | whole export: "+core.getTimingReport(timer.stages))
+        lines.append("\r\nNotes: "+notes)
+        core.writeExportLog(job["directory"], job["file_name"], lines)
+        if job["reused"]:
+            status = "reused"
+        elif job["errors"]:
+            status = "rejected"
+        else:
+            status = "saved" if saved else "failed"
+        record = core.getTelemetryRecord(job, status, context, pass_stats)
+        record["bytes"] = set_bytes.get(currentSet, 0) if status == "saved" else 0
+        core.writeTelemetry(job["directory"], job["file_name"], record)
+        if not saved:
+            sets_not_saved_to_alembic.append(currentSet)
+    if catalog_entries:
+        core.recordCatalog(exportsSubdirectory, catalog_entries)
+    return sets_not_saved_to_alembic
+
+################################################################################
+def getExportOptions(args):
+    return {
+        "namespaces_only": not args.full_names,
+        "export_only_visible": not args.include_hidden,
+        "batch_export": not args.one_pass_per_set,
+        "collapse_roots": args.collapse_roots,
+        "force": args.force,
+        "evaluation_mode": args.evaluation,
+        "static_once": args.static_once,
+        "static_samples": args.static_samples,
+        "scratch_directory": args.scratch,
+        "dedupe": not args.no_dedupe,
+        "profile": args.profile,
+    }
+
+def getMayapy():
+    if os.environ.get("MAYA_LOCATION"):
+        return os.path.join(os.environ["MAYA_LOCATION"], "bin", "mayapy")
+    return "mayapy"
+
+def buildWorkerCommand(scenes, args):
+    command = [args.mayapy, os.path.abspath(__file__), "--worker", "--notes", args.notes]
+    for pattern in args.sets:
+        command += ["--sets", pattern]
+    if args.output:
+        command += ["--output", args.output]
+    if args.full_names:
+        command.append("--full-names")
+    if args.include_hidden:
+        command.append("--include-hidden")
+    if args.one_pass_per_set:
+        command.append("--one-pass-per-set")
+    if args.collapse_roots:
+        command.append("--collapse-roots")
+    if args.force:
+        command.append("--force")
+    if args.evaluation:
+        command += ["--evaluation", args.evaluation]
+    if args.static_once:
+        command += ["--static-once", "--static-samples", str(args.static_samples)]
+    if args.scratch:
+        command += ["--scratch", args.scratch]
+    if args.no_dedupe:
+        command.append("--no-dedupe")
+    if args.profile:
+        command += ["--profile", args.profile]
+    if args.chunks > 1:
+        command += ["--chunks", str(args.chunks), "--handles", str(args.handles), "--mayapy", args.mayapy]
+    return command+list(scenes)
+
+def launchWorker(scenes, args, report):
+    """ Run the scenes, one after the other, in ONE mayapy process (Maya starts
+    once). Reports every scene when it is done. Returns their result dicts, in order
+    """
+    results = {}
+    process = subprocess.Popen(buildWorkerCommand(scenes, args), stdout=subprocess.PIPE, universal_newlines=True)
+    for line in process.stdout:
+        if not line.startswith(message_prefix):
+            continue
+        message = json.loads(line[len(message_prefix):])
+        report(message)
+        if message.get("status") == "done":
+            results[message["scene"]] = message
+    process.wait()
+    for scene in scenes:
+        if scene not in results:
+            error = "Worker exited with code "+str(process.returncode) if process.returncode else "Worker did not report"
+            results[scene] = {"scene": scene, "sets": [], "failed": [], "error": error}
+            report(dict(results[scene], status="done"))
+    return [results[scene] for scene in scenes]
+
+def getWorkerShares(scenes, workers):
+    # scenes of every worker, round robin: long and short shots get mixed
+    workers = max(1, min(workers, len(scenes)))
+    return [scenes[worker::workers] for worker in range(workers)]
+
+def runBatch(scenes, args, launcher=launchWorker, report=None):
+    """ Spread the scenes over "args.workers" long lived processes, each one
+    exports its share of the scenes (getWorkerShares) after ONE Maya start up.
+    "launcher(scenes, args, report)" runs the scenes of one worker, reports
+    {"status": "done", ...} for each and returns their result dicts in order.
+    Replace it to run in process (tests, stub cmds).
+    Returns the results in the same order as the scenes.
+    """
+    lock = threading.Lock()
+    def safeReport(message):
+        with lock:
+            (report or printMessage)(message)
+    shares = getWorkerShares(scenes, args.workers)
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(shares))) as pool:
+        for share, share_results in zip(shares, pool.map(lambda share: launcher(share, args, safeReport), shares)):
+            results.update(zip(share, share_results))
+    return [results[scene] for scene in scenes]
+
+def printMessage(message):
+    if message.get("status") != "done":
+        print("["+message["scene"]+"] "+message["status"])
+    elif message.get("error"):
+        print("["+message["scene"]+"] ERROR: "+message["error"])
+    elif message.get("failed"):
+        print("["+message["scene"]+"] NOT SAVED: "+", ".join(message["failed"]))
+        for name in message.get("problems", {}):
+            for problem in message["problems"][name]:
+                print("["+message["scene"]+"]     "+name+": "+problem)
+    else:
+        print("["+message["scene"]+"] saved "+str(len(message["sets"]))+" sets")
+
+################################################################################
+def parseArguments(argv=None):
+    parser = argparse.ArgumentParser(description="Export character SETs of many Maya scenes to Alembic")
+    parser.add_argument("scenes", nargs="+", help="Maya scenes to export")
+    parser.add_argument("-s", "--sets", action="append", default=[], help="Set name pattern, can be repeated (default: *)")
+    parser.add_argument("-o", "--output", default=None, help="Output root (default: exports/abc of the project)")
+    parser.add_argument("-w", "--workers", type=int, default=max(1, (os.cpu_count() or 2)//2), help="Number of mayapy processes")
+    parser.add_argument("--mayapy", default=getMayapy(), help="mayapy executable")
+    parser.add_argument("--notes", default="Batch export", help="Notes for the log")
+    parser.add_argument("--full-names", action="store_true", help="Use the full set name instead of the namespace only")
+    parser.add_argument("--include-hidden", action="store_true", help="Export hidden objects too")
+    parser.add_argument("--one-pass-per-set", action="store_true", help="One AbcExport call per set")
+    parser.add_argument("--collapse-roots", action="store_true", help="Collapse whole subtrees to their parent (parents are written too)")
+    parser.add_argument("--force", action="store_true", help="Export sets even if nothing changed since the last export")
+    parser.add_argument("--evaluation", choices=["parallel", "serial", "off"], default=None, help="Evaluation manager mode for the export (default: scene setting)")
+    parser.add_argument("--static-once", action="store_true", help="Write objects that never move once, in <name>_static.abc")
+    parser.add_argument("--static-samples", type=int, default=0, help="Frames sampled to check objects that look animated (0 = no check)")
+    parser.add_argument("--scratch", default=None, help="Write to this local folder first, then copy to the output with checksums")
+    parser.add_argument("--no-dedupe", action="store_true", help="Do not put the versions in the content addressed store")
+    parser.add_argument("--profile", choices=sorted(core.getExportProfiles()), default=None,
+                        help="Export profile: flags, frame step, namespaces and sub folder (default: "+core.default_profile+")")
+    parser.add_argument("--chunks", type=int, default=1, help="Split the frame range of every scene over N workers")
+    parser.add_argument("--handles", type=int, default=0, help="Extra frames written on each side of a chunk")
+    parser.add_argument("--chunk-jobs", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if not args.sets:
+        args.sets = ["*"]
+    return args
+
+def main(argv=None):
+    args = parseArguments(argv)
+    if args.chunk_jobs:
+        chunkWorkerMain(args)
+        return 0
+    if args.worker:
+        workerMain(args)
+        return 0
+    results = runBatch(args.scenes, args)
+    failed = [r for r in results if r.get("error") or r.get("failed")]
+    print("GW Alembic batch: "+str(len(results)-len(failed))+"/"+str(len(results))+" scenes exported")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
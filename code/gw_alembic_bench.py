@@ -0,0 +1,121 @@
+'''
+GW Alembic saver - BENCHMARKS
+"versions" runs with plain python, no Maya needed. "profiles" exports a scene
+with every export profile, run it with mayapy.
+
+    python gw_alembic_bench.py versions --files 500 --repeat 200
+    mayapy gw_alembic_bench.py profiles shot010_anim.ma -s "*:geo_cache_set" --repeat 3
+'''
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import gw_alembic_core as core
+
+################################################################################
+def timeIt(function, repeat):
+    start_time = time.perf_counter()
+    for i in range(repeat):
+        function()
+    return (time.perf_counter()-start_time)/repeat
+
+def benchVersions(files=500, repeat=200, directory=None):
+    """ Folder scan of getVersion_abc against the index of reserveVersion_abc,
+    on a folder with "files" versions. Use "directory" to test on network storage.
+    """
+    folder = tempfile.mkdtemp(prefix="gw_versions_", dir=directory)
+    try:
+        for version in range(1, files+1):
+            open(os.path.join(folder, "asset_v"+str(version).zfill(3)+".abc"), "w").close()
+        open(os.path.join(folder, "asset.log"), "w").close()
+        scan = timeIt(lambda: core.getVersion_abc(folder), repeat)
+        core.reserveVersion_abc(folder, "asset") # builds the index
+        index = timeIt(lambda: core.reserveVersion_abc(folder, "asset"), repeat)
+    finally:
+        shutil.rmtree(folder)
+    print("Versions in folder: "+str(files))
+    print("getVersion_abc     (scan) : %.3f ms" % (scan*1000))
+    print("reserveVersion_abc (index): %.3f ms" % (index*1000))
+    print("Speed up                  : %.1fx" % (scan/index))
+    return scan, index
+
+def benchProfiles(scene, set_patterns, profiles=None, repeat=1, directory=None, evaluation_mode=None):
+    """ Time and size of the sets of "scene" matching "set_patterns", exported
+    with every profile (default: all of them, "final" first). Every export is
+    forced, to a temp folder, in one AbcExport pass. Seconds are the best of "repeat".
+    Needs Maya (or a stub core.cmds). Returns {profile: {"sets", "frames", "seconds", "bytes"}}
+    """
+    import gw_alembic_batch
+    core.cmds.file(scene, open=True, force=True)
+    core.loadAbcExportPlugin()
+    sets_to_export = gw_alembic_batch.matchSets(core.getUserSets(), set_patterns)
+    if not sets_to_export:
+        raise RuntimeError("No sets matching: "+", ".join(set_patterns))
+    if not profiles:
+        profiles = [core.default_profile]+sorted(name for name in core.getExportProfiles() if name != core.default_profile)
+    start, end = core.getFrameRange()
+    results = {}
+    folder = tempfile.mkdtemp(prefix="gw_profiles_", dir=directory)
+    try:
+        for name in profiles:
+            profile = core.getExportProfile(name)
+            frames = core.getProfileFrames(start, end, profile)
+            result = {"sets": 0, "frames": frames, "seconds": None, "bytes": 0}
+            for i in range(repeat):
+                jobs = core.buildExportJobs(sets_to_export, tempfile.mkdtemp(dir=folder), start, end, force=True, profile=profile)
+                valid_jobs = [job for job in jobs if not job["errors"]]
+                with core.FastBake(frames, evaluation_mode):
+                    start_time = time.perf_counter()
+                    saved = core.exportAlembicJobsBatched(valid_jobs)
+                    seconds = time.perf_counter()-start_time
+                result["seconds"] = seconds if result["seconds"] is None else min(result["seconds"], seconds)
+                result["sets"] = len([job for job in valid_jobs if saved.get(job["set"])])
+                result["bytes"] = sum(core.getOutputBytes(job) for job in valid_jobs if saved.get(job["set"]))
+            results[name] = result
+    finally:
+        shutil.rmtree(folder)
+    reference = results[profiles[0]]
+    print("Scene: "+scene+" Frames: "+str(start)+"-"+str(end)+" Sets: "+str(len(sets_to_export)))
+    print("%-12s %5s %7s %9s %10s %8s %8s" % ("profile", "sets", "frames", "seconds", "MB", "time", "size"))
+    for name in profiles:
+        result = results[name]
+        print("%-12s %5d %7d %9.2f %10.1f %7.0f%% %7.0f%%" % (
+            name, result["sets"], result["frames"], result["seconds"], result["bytes"]/(1024.0*1024.0),
+            100.0*result["seconds"]/reference["seconds"] if reference["seconds"] else 0.0,
+            100.0*result["bytes"]/reference["bytes"] if reference["bytes"] else 0.0))
+    print("(time and size against "+profiles[0]+")")
+    return results
+
+################################################################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GW Alembic saver benchmarks")
+    commands = parser.add_subparsers(dest="bench")
+    versions = commands.add_parser("versions", help="Version scan against version index")
+    versions.add_argument("--files", type=int, default=500)
+    versions.add_argument("--repeat", type=int, default=200)
+    versions.add_argument("--directory", default=None, help="Where to create the test folder")
+    profiles = commands.add_parser("profiles", help="Time and size of every export profile (mayapy)")
+    profiles.add_argument("scene")
+    profiles.add_argument("-s", "--sets", action="append", default=[], help="Set name pattern, can be repeated (default: *)")
+    profiles.add_argument("--profiles", nargs="+", default=None, help="Profiles to compare, the first one is the reference")
+    profiles.add_argument("--repeat", type=int, default=1)
+    profiles.add_argument("--directory", default=None, help="Where to export (default: temp folder)")
+    profiles.add_argument("--evaluation", choices=["parallel", "serial", "off"], default=None)
+    args = parser.parse_args(argv)
+    if args.bench == "versions":
+        benchVersions(args.files, args.repeat, args.directory)
+    elif args.bench == "profiles":
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+        import maya.cmds
+        core.cmds = maya.cmds
+        benchProfiles(args.scene, args.sets or ["*"], args.profiles, args.repeat, args.directory, args.evaluation)
+        maya.standalone.uninitialize()
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+'''
+GW Alembic saver - EXPORT CATALOG
+Query the SQLite catalog of an exports folder (<exports>/.gw_catalog.sqlite,
+updated by every export) and rebuild it from the .log files of the sets.
+Runs with plain python, no Maya needed.
+
+    python gw_alembic_catalog.py latest /proj/exports/abc charA
+    python gw_alembic_catalog.py find /proj/exports/abc --scene shot010_anim_v003.ma
+    python gw_alembic_catalog.py rebuild /proj/exports/abc --hash
+
+From other tools:
+    import gw_alembic_core as core
+    core.getLatestCache("/proj/exports/abc", "charA")["path"]
+'''
+
+import argparse
+import datetime
+import json
+import os
+import re
+
+import gw_alembic_core as core
+
+log_separator = "------------------------------------------------------------------------------"
+log_fields = [
+    ("set", re.compile(r"^Set: (.*) Version:(\S+)")),
+    ("user", re.compile(r"^User name: (.*) Machine: (.*)")),
+    ("frames", re.compile(r"^Starf frame: (\S+) End frame: (\S+)(?: Frames per second: (\S+))?")),
+    ("scene", re.compile(r"^Original Full path:(.*)")),
+    ("latest", re.compile(r"^Alembic Full path :(.*)")),
+    ("backup", re.compile(r"^BackUp file       :(.*)")),
+    ("manifest", re.compile(r"^Manifest          :(.*)")),
+    ("hash", re.compile(r"^(?:Store|Checksum): (\S+) sha256 (\w+)")),
+    ("profile", re.compile(r"^Profile: (\S+)")),
+]
+
+################################################################################
+def parseExportLog(log_name):
+    """ The entries of a .log as dicts: time, set, version, user, host, start,
+    end, fps, scene, latest, backup (or manifest), hashes {file: sha256}, notes,
+    reused, profile. Entries of any exporter version, fields missing in old ones are None
+    """
+    with open(log_name) as log_file:
+        blocks = log_file.read().split(log_separator+"\n")
+    entries = []
+    for block in blocks:
+        lines = block.split("\n")
+        if not lines[0].strip():
+            continue
+        entry = {"time": lines[0].strip(), "set": None, "version": None, "user": None, "host": None, "start": None, "end": None,
+                 "fps": None, "scene": None, "latest": None, "backup": None, "manifest": None, "hashes": {}, "notes": "",
+                 "reused": False, "profile": None}
+        notes = None
+        for line in lines[1:]:
+            if notes is not None:
+                notes.append(line)
+                continue
+            if line.startswith("Notes: "):
+                notes = [line[len("Notes: "):]]
+                continue
+            if line.startswith("Unchanged since last export"):
+                entry["reused"] = True
+            for field, pattern in log_fields:
+                match = pattern.match(line)
+                if not match:
+                    continue
+                if field == "set":
+                    entry["set"], entry["version"] = match.group(1), match.group(2)
+                elif field == "user":
+                    entry["user"], entry["host"] = match.group(1), match.group(2)
+                elif field == "frames":
+                    entry["start"], entry["end"], entry["fps"] = float(match.group(1)), float(match.group(2)), match.group(3)
+                elif field == "hash":
+                    entry["hashes"][match.group(1)] = match.group(2)
+                else:
+                    entry[field] = match.group(1).strip()
+        entry["notes"] = "\n".join(notes or []).strip()
+        entries.append(entry)
+    return entries
+
+def getLogTime(text):
+    # "2026-10-17 07:07" --> ISO, like the catalog
+    try:
+        return datetime.datetime.strptime(text, "%Y-%m-%d %H:%M").isoformat()
+    except ValueError:
+        return text
+
+def getCatalogEntries(exports_root, folder, compute_hash=False):
+    """ Catalog rows of ONE folder of versions, from its log. Only versions still
+    on disk. The paths of the log are from the machine that exported, the
+    files are looked for in "folder"
+    """
+    file_name = os.path.basename(folder)
+    log_name = os.path.join(folder, file_name+".log")
+    if not os.path.exists(log_name):
+        return []
+    rows = {}
+    for entry in parseExportLog(log_name):
+        written = entry["manifest"] or entry["backup"]
+        if entry["reused"] or not entry["set"] or not written or entry["version"] == "N/A":
+            continue
+        path = os.path.join(folder, os.path.basename(written.replace("\\", "/")))
+        if not os.path.exists(path):
+            continue # pruned or never written
+        latest = None
+        if entry["latest"]:
+            latest = os.path.join(exports_root, os.path.basename(entry["latest"].replace("\\", "/")))
+            if entry["manifest"]:
+                latest = latest[:-len(".abc")]+".manifest.json"
+        static_path = path[:-len(".abc")]+"_static.abc" if path.endswith(".abc") else None
+        if static_path and not os.path.exists(static_path):
+            static_path = None
+        size = os.path.getsize(path)+(os.path.getsize(static_path) if static_path else 0)
+        sha256 = entry["hashes"].get(os.path.basename(path))
+        if sha256 is None and compute_hash:
+            sha256 = core.getFileHash(path)
+        rows[path] = {"name": file_name, "set_name": entry["set"], "namespace": core.getNamespace(entry["set"]),
+                      "version": entry["version"], "version_number": core.getVersionNumber(os.path.basename(path), file_name),
+                      "path": path, "latest_path": latest, "static_path": static_path,
+                      "start": entry["start"], "end": entry["end"], "fps": entry["fps"], "scene": entry["scene"],
+                      "size": size, "sha256": sha256, "user": entry["user"], "host": entry["host"],
+                      "notes": entry["notes"], "exported": getLogTime(entry["time"]),
+                      "profile": entry["profile"] or core.default_profile} # logs older than the profiles: all "final"
+    return list(rows.values())
+
+def rebuildCatalog(exports_root, compute_hash=False):
+    """ New catalog from the logs of every folder of the exports root, swapped in
+    at the end (queries keep working on the old one meanwhile). Returns the rows count
+    """
+    temp_name = os.path.join(exports_root, core.catalog_name+".rebuild"+str(os.getpid()))
+    if os.path.exists(temp_name):
+        os.remove(temp_name)
+    entries = []
+    for name in sorted(os.listdir(exports_root)):
+        folder = os.path.join(exports_root, name)
+        if os.path.isdir(folder) and name != core.store_directory_name:
+            entries.extend(getCatalogEntries(exports_root, folder, compute_hash))
+    if not core.recordCatalog(exports_root, entries, catalog_file=temp_name):
+        raise RuntimeError("Could not write "+temp_name)
+    os.replace(temp_name, os.path.join(exports_root, core.catalog_name))
+    return len(entries)
+
+################################################################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GW Alembic saver export catalog")
+    commands = parser.add_subparsers(dest="command")
+    latest = commands.add_parser("latest", help="Latest version of a name, set or namespace")
+    latest.add_argument("exports")
+    latest.add_argument("name")
+    find = commands.add_parser("find", help="Exports matching all the filters given")
+    find.add_argument("exports")
+    find.add_argument("--name", default=None, help="File name or set")
+    find.add_argument("--namespace", default=None)
+    find.add_argument("--scene", default=None, help="Full path or file name of the Maya scene")
+    rebuild = commands.add_parser("rebuild", help="Rebuild the catalog from the logs")
+    rebuild.add_argument("exports")
+    rebuild.add_argument("--hash", action="store_true", help="Compute the sha256 missing in old logs (reads every file)")
+    args = parser.parse_args(argv)
+
+    if args.command == "latest":
+        try:
+            row = core.getLatestCache(args.exports, args.name)
+        except ValueError as e:
+            print(e)
+            return 1
+        print(json.dumps(row, indent=1))
+        return 0 if row else 1
+    elif args.command == "find":
+        print(json.dumps(core.findCaches(args.exports, args.name, args.namespace, args.scene), indent=1))
+    elif args.command == "rebuild":
+        print("Catalog rebuilt: "+str(rebuildCatalog(args.exports, args.hash))+" exports")
+    else:
+        parser.print_help()
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2001 @@
+'''
+GW Alembic saver - CORE library
+Set discovery, versioning, AbcExport command building, back-ups and logs.
+
+Importing this module has NO side effects: no scene check, no plug-in loading,
+no UI. It does not import PySide2 or pymel, so it can be used from "mayapy"
+batch jobs and from tests (replace "cmds" with a stub: gw_alembic_core.cmds = stub).
+The dialog lives in gw_alembic_ui.py, the shelf launcher is bake_geo_python3.py
+'''
+
+import contextlib
+import datetime
+import getpass
+import hashlib
+import json
+import time
+import os
+import re
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import maya.cmds as cmds
+except ImportError:
+    cmds = None # outside Maya, set a stub before calling anything
+
+software_version = 'Glassworks Sets Alembic Exporter 1.5.4'
+
+maya_standar_sets = [(u'defaultLightSet'),(u'defaultObjectSet')]
+restriction_attrs = ["verticesOnlySet", "edgesOnlySet", "facetsOnlySet", "editPointsOnlySet", "renderableOnlySet"]
+outliner_set_types = ["objectSet", "textureBakeSet", "vertexBakeSet", "character"]
+
+alembic_flags = "-uvWrite -writeColorSets -writeFaceSets -worldSpace -writeUVSets -dataFormat ogawa"
+preview_flags = "-noNormals -worldSpace -dataFormat ogawa" # positions only, for layout and animation reviews
+# EXPORT PROFILES: AbcExport flags (attribute streams), frame "step" (2 = every other frame),
+# "strip_namespaces" and "subdirectory" of the exports root ("" = the root itself, where "final" goes)
+export_profiles = {
+    "final": {"flags": alembic_flags, "step": 1, "strip_namespaces": False, "subdirectory": ""},
+    "preview": {"flags": preview_flags, "step": 1, "strip_namespaces": True, "subdirectory": "preview"},
+    "blocking": {"flags": preview_flags, "step": 2, "strip_namespaces": True, "subdirectory": "blocking"},
+}
+default_profile = "final"
+profiles_variable = "GW_ALEMBIC_PROFILES" # JSON file with more profiles, or new values for these
+max_command_length = 1024*1024 # AbcExport job strings longer than this are slow to build and parse
+version_index_name = ".gw_versions" # sidecar index in every folder of versions
+version_pattern = re.compile(r'_v(\d{2,})(?:_static|_chunk\d+)?\.(?:abc|manifest\.json)$') # at the END: "treeA_v003:geo_set" is not a version
+catalog_name = ".gw_catalog.sqlite" # index of every export, in the exports root
+catalog_columns = ["name", "set_name", "namespace", "version", "version_number", "path", "latest_path", "static_path",
+                   "start", "end", "fps", "scene", "size", "sha256", "user", "host", "notes", "exported", "profile"]
+store_directory_name = ".gw_store" # content addressed store of the versions, in the exports root
+telemetry_version = 1 # "schema" of the records in <name>.jsonl
+export_hooks = [] # hook(jobs) --> context manager, entered around the AbcExport call (profilers)
+
+def setFilterScript(name):
+    """ Filter non outliner sets
+    """
+    # We first test for plug-in object sets.
+    try:
+        apiNodeType = cmds.nodeType(name, api=True)
+    except RuntimeError:
+        return False
+
+    if apiNodeType == "kPluginObjectSet":
+        return True
+
+    # We do not need to test is the object is a set, since that test
+    # has already been done by the outliner
+    try:
+        nodeType = cmds.nodeType(name)
+    except RuntimeError:
+        return False
+
+    # We do not want any rendering sets
+    if nodeType == "shadingEngine":
+        return False
+
+    # if the object is not a set, return false
+    if not (nodeType == "objectSet" or
+            nodeType == "textureBakeSet" or
+            nodeType == "vertexBakeSet" or
+            nodeType == "character"):
+        return False
+
+    # We also do not want any sets with restrictions
+    if any(cmds.getAttr("{0}.{1}".format(name, attr)) for attr in restriction_attrs):
+        return False
+
+    # Do not show layers
+    if cmds.getAttr("{0}.isLayer".format(name)):
+        return False
+
+    # Do not show bookmarks
+    annotation = cmds.getAttr("{0}.annotation".format(name))
+    if annotation == "bookmarkAnimCurves":
+        return False
+
+    # Whew ... we can finally show it
+    return True
+
+def readSetsFlags(names):
+    """ Restriction, layer and annotation of many sets in ONE pass.
+    Returns {name: True if it is a set to show}
+    Uses the API (no command per attribute), or cmds.getAttr outside Maya
+    """
+    try:
+        import maya.api.OpenMaya as om
+    except ImportError:
+        om = None
+    flags = {}
+    if om is None:
+        for name in names:
+            try:
+                flags[name] = setFilterScript(name)
+            except (RuntimeError, ValueError):
+                flags[name] = False
+        return flags
+    selection = om.MSelectionList()
+    for name in names:
+        selection.add(name)
+    for i, name in enumerate(names):
+        try:
+            node = om.MFnDependencyNode(selection.getDependNode(i))
+            flags[name] = not (
+                any(node.findPlug(attr, False).asBool() for attr in restriction_attrs) or
+                node.findPlug("isLayer", False).asBool() or
+                node.findPlug("annotation", False).asString() == "bookmarkAnimCurves")
+        except RuntimeError:
+            flags[name] = False
+    return flags
+
+def getOutlinerSets():
+    """ Same sets as setFilterScript, with a few calls for the whole scene
+    """
+    names_and_types = cmds.ls(sets=True, showType=True) or []
+    names = names_and_types[0::2]
+    types = names_and_types[1::2]
+    to_check = []
+    shown = set()
+    for name, nodeType in zip(names, types):
+        if nodeType in outliner_set_types:
+            to_check.append(name)
+        elif nodeType != "shadingEngine":
+            # plug-in object sets are always shown (few of them)
+            try:
+                if cmds.nodeType(name, api=True) == "kPluginObjectSet":
+                    shown.add(name)
+            except RuntimeError:
+                pass
+    flags = readSetsFlags(to_check)
+    return [name for name in names if name in shown or flags.get(name)]
+
+################################################################################
+# Sets found in the scene, kept until the scene changes (callbacks)
+sets_cache = {"sets": None, "callbacks": []}
+
+def invalidateSetsCache(*args):
+    sets_cache["sets"] = None
+
+def installSetsCallbacks():
+    """ Scene and node callbacks that clear the sets cache. False if not possible
+    """
+    if sets_cache["callbacks"]:
+        return True
+    try:
+        import maya.api.OpenMaya as om
+    except ImportError:
+        return False
+    callbacks = []
+    for message in [om.MSceneMessage.kAfterOpen, om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterImport,
+                    om.MSceneMessage.kAfterCreateReference, om.MSceneMessage.kAfterRemoveReference,
+                    om.MSceneMessage.kAfterLoadReference, om.MSceneMessage.kAfterUnloadReference]:
+        callbacks.append(om.MSceneMessage.addCallback(message, invalidateSetsCache))
+    callbacks.append(om.MDGMessage.addNodeAddedCallback(invalidateSetsCache, "objectSet"))
+    callbacks.append(om.MDGMessage.addNodeRemovedCallback(invalidateSetsCache, "objectSet"))
+    callbacks.append(om.MNodeMessage.addNameChangedCallback(om.MObject(), invalidateSetsCache))
+    sets_cache["callbacks"] = callbacks
+    return True
+
+def removeSetsCallbacks():
+    if sets_cache["callbacks"]:
+        import maya.api.OpenMaya as om
+        om.MMessage.removeCallbacks(sets_cache["callbacks"])
+    sets_cache["callbacks"] = []
+    invalidateSetsCache()
+################################################################################
+def objectIsVisible(object):
+    # if visibility is false. return false
+    if cmds.attributeQuery("visibility", node = object, exists =True) == False:
+        return False
+    #if cmds.attributeQuery(node = object, exists ="intermediateObject") == False:
+    #    return False
+    visible = cmds.getAttr(object+".visibility")
+    if visible == False:
+        return False
+    parent = cmds.listRelatives(object, parent=True, fullPath = True)
+    if parent == None:
+        return visible
+    return objectIsVisible(parent[0])
+
+class VisibilityResolver(object):
+    """ Resolves visibility of many DAG objects at once.
+    Every ancestor is resolved only ONCE and the result is cached, and the nodes
+    not in the cache yet are queried with TWO "ls" calls for all of them
+    (intermediate objects, visible nodes), not with getAttr per node.
+    Hidden means: visibility off, intermediate object, or drawing override
+    (display layer) with visibility off, on the node or ANY of its parents.
+    """
+    def __init__(self):
+        self.cache = {}
+        self.queried = 0 # number of DAG nodes resolved in Maya
+
+    def filterVisible(self, objects):
+        """ objects MUST be full paths (ls -long). Returns the visible ones, same order.
+        Members that are not DAG nodes (no "|", a shader or any DG node in the set)
+        are never visible, as before
+        """
+        # all ancestors are in the full path, no need for listRelatives
+        pending = []
+        seen = set()
+        for obj in objects:
+            path = ""
+            for name in obj.split("|")[1:]:
+                path = path+"|"+name
+                if path not in self.cache and path not in seen:
+                    seen.add(path)
+                    pending.append(path)
+        if pending:
+            # one call for all the intermediate objects, one for the visible ones
+            # ("ls -visible": visibility and drawing overrides, parents included)
+            intermediates = set(cmds.ls(pending, long=True, intermediateObjects=True) or [])
+            visible = set(cmds.ls(pending, long=True, visible=True) or [])
+            # parents are always before children in "pending"
+            for path in pending:
+                self.queried += 1
+                parent = path.rsplit("|", 1)[0]
+                if parent and not self.cache[parent]:
+                    self.cache[path] = False
+                else:
+                    self.cache[path] = path in visible and path not in intermediates
+        return [obj for obj in objects if self.cache.get(obj, False)]
+
+################################################################################
+def exportAlembicJobs(jobs):
+    """ Export every job with its own AbcExport call (one playback per set).
+    Returns a dict {set: True/False}
+    """
+    results = {}
+    for job in jobs:
+        if exportJobsOnce([job]):
+            results[job["set"]] = True
+        else:
+            results.update(failJob(job))
+    return results
+
+def getJobCommands(job):
+    # the job of the set, and the one of its static objects if any
+    if job.get("static_command"):
+        return [job["command"], job["static_command"]]
+    return [job["command"]]
+
+def removeJobOutputs(job):
+    # AbcExport opens every archive of a call on the first frame and closes them
+    # when it fails: all of them are truncated, not only the one of the failing set
+    for output in [job["version_name"], job.get("static_version_name")]:
+        if output and os.path.exists(output):
+            os.remove(output)
+
+def getProbeCommand(command):
+    # same job on its first frame only
+    return re.sub(r'^-frameRange (\S+) \S+', r'-frameRange \1 \1', command)
+
+def probeJob(job):
+    """ One frame AbcExport of the job: finds the sets that cannot be exported
+    at all without playing the whole range again. The probe files are removed
+    """
+    try:
+        cmds.AbcExport ( j = [getProbeCommand(command) for command in getJobCommands(job)] )
+        return True
+    except:
+        return False
+    finally:
+        removeJobOutputs(job)
+
+def exportAlembicJobsBatched(jobs):
+    """ Export all jobs in ONE AbcExport call, the scene is evaluated once per frame
+    for every set. If the call fails, every file of the call is removed (truncated),
+    each job is probed on one frame (probeJob) and the good ones are exported
+    again in one call. If that fails too, the set fails on a later frame: the
+    remaining jobs are exported one by one.
+    Returns a dict {set: True/False}
+    """
+    results = {}
+    if not jobs:
+        return results
+    # two sets writing the same file cannot go in the same call, they go in a later pass
+    outputs = []
+    first = []
+    later = []
+    for job in jobs:
+        if job["version_name"] in outputs:
+            later.append(job)
+        else:
+            outputs.append(job["version_name"])
+            first.append(job)
+    if later:
+        results.update(exportAlembicJobsBatched(first))
+        results.update(exportAlembicJobsBatched(later))
+        return results
+    if exportJobsOnce(jobs):
+        for job in jobs:
+            results[job["set"]] = True
+        return results
+    if len(jobs) == 1:
+        results.update(failJob(jobs[0]))
+        return results
+    good = []
+    for job in jobs:
+        if probeJob(job):
+            good.append(job)
+        else:
+            results.update(failJob(job))
+    if good and exportJobsOnce(good):
+        for job in good:
+            results[job["set"]] = True
+    elif good:
+        results.update(exportAlembicJobs(good))
+    return results
+
+def exportJobsOnce(jobs):
+    # one AbcExport call, nothing left behind if it fails
+    try:
+        cmds.AbcExport ( j = [command for job in jobs for command in getJobCommands(job)] )
+        return True
+    except:
+        for job in jobs:
+            removeJobOutputs(job)
+        return False
+
+def failJob(job):
+    cmds.warning( "Failed to save Alembic of :" +job["set"] )
+    print (job["command"])
+    return {job["set"]: False}
+
+################################################################################
+def getFoldersFiles_abc(path):
+    # kept for old tools: the catalog answers without listing (getLatestCache, findCaches)
+    folderList = []
+    fileList = []
+    try:
+        allData = os.listdir(path)
+        folderList = [f for f in allData if os.path.isdir(os.path.join(path, f))]
+        for file in allData:
+            if file.endswith(".abc"):
+                fileList.append(file)
+        fileList.sort()
+        fileList.reverse()
+    except:
+        pass
+    return folderList, fileList
+
+def getVersion_abc(saveLocationDir):
+    if not os.path.exists(saveLocationDir):
+        nextVersion = "1"
+    else:
+        allFiles = os.listdir(saveLocationDir)
+        nextVersion = "1" # pre-setting this in case we don't get a match below
+        if allFiles:
+            versions = []
+            for file in allFiles:
+                if file.endswith(".abc"):
+                    version_double = re.search(r'_v(\d\d)', file)
+                    version_triple = re.search(r'_v(\d\d\d)', file)
+                    if version_double:
+                        versionNumber = str(int(version_double.group(1)))
+                        versions.append(versionNumber)
+                    if version_triple:
+                        versionNumber = str(int(version_triple.group(1)))
+                        versions.append(versionNumber)
+            if versions:
+                sortedVersions = sorted(versions, key=int)
+                lastVersion = sortedVersions[-1]
+                nextVersion = int(lastVersion) + 1
+                nextVersion = str(nextVersion)
+    nextVersion = "v" + nextVersion.zfill(3)
+    return nextVersion
+
+def scanVersions_abc(saveLocationDir, file_name=None):
+    """ Last version number in the folder, ONE os.scandir pass. 0 if none
+    "file_name": only its versions (<file_name>_vNNN...), default: all
+    """
+    lastVersion = 0
+    try:
+        for entry in os.scandir(saveLocationDir):
+            number = getVersionNumber(entry.name, file_name)
+            if number is not None:
+                lastVersion = max(lastVersion, number)
+    except OSError:
+        pass
+    return lastVersion
+
+def versionExists(saveLocationDir, file_name, version):
+    # the file AbcExport would write, or the manifest of a sharded export
+    name = os.path.join(saveLocationDir, file_name+"_v"+str(version).zfill(3))
+    return os.path.exists(name+".abc") or os.path.exists(name+".manifest.json")
+
+def getVersionNumber(name, file_name=None):
+    """ Version number of a file of a version: <file_name>_vNNN.abc, _static.abc,
+    _chunkNN.abc or .manifest.json. None if it is not one (or not one of "file_name")
+    """
+    match = version_pattern.search(name)
+    if not match:
+        return None
+    if file_name is not None and not (name.startswith(file_name) and match.start() == len(file_name)):
+        return None
+    return int(match.group(1))
+
+def lockFile(fileObject, wait=True):
+    # blocks until the lock is ours. POSIX locks also work on NFS
+    # wait=False: raises OSError / IOError if someone else has it
+    fileObject.seek(0)
+    try:
+        import fcntl
+        fcntl.lockf(fileObject.fileno(), fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except ImportError:
+        import msvcrt
+        msvcrt.locking(fileObject.fileno(), msvcrt.LK_LOCK if wait else msvcrt.LK_NBLCK, 1)
+
+def unlockFile(fileObject):
+    fileObject.seek(0)
+    try:
+        import fcntl
+        fcntl.lockf(fileObject.fileno(), fcntl.LOCK_UN)
+    except ImportError:
+        import msvcrt
+        msvcrt.locking(fileObject.fileno(), msvcrt.LK_UNLCK, 1)
+
+def reserveVersion_abc(saveLocationDir, file_name=None):
+    """ Gives the next version of the folder and RESERVES it, so two exports of the
+    same asset at the same time never get the same version.
+    Uses the index file of the folder (O(1)). The index is rebuilt with one scan
+    of the folder if it is missing, broken, or stale (the version it would give
+    already exists on disk, written by an older exporter)
+    """
+    if not os.path.exists(saveLocationDir):
+        os.makedirs(saveLocationDir)
+    index_name = os.path.join(saveLocationDir, version_index_name)
+    index_file = os.fdopen(os.open(index_name, os.O_RDWR | os.O_CREAT), "r+")
+    try:
+        lockFile(index_file)
+        try:
+            try:
+                lastVersion = int(json.loads(index_file.read())["last"])
+            except (ValueError, KeyError, TypeError):
+                lastVersion = None
+            if lastVersion is not None and file_name and versionExists(saveLocationDir, file_name, lastVersion+1):
+                lastVersion = None
+            if lastVersion is None:
+                lastVersion = scanVersions_abc(saveLocationDir, file_name)
+            lastVersion += 1
+            # never an existing file: AbcExport would truncate it (a store object, maybe)
+            while file_name and versionExists(saveLocationDir, file_name, lastVersion):
+                lastVersion += 1
+            index_file.seek(0)
+            index_file.truncate()
+            index_file.write(json.dumps({"last": lastVersion}))
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        finally:
+            unlockFile(index_file)
+    finally:
+        index_file.close()
+    return "v" + str(lastVersion).zfill(3)
+
+################################################################################
+def loadAbcExportPlugin():
+    """ Check if plug-in AbcExport is loaded, and load it if needed.
+    """
+    if not cmds.pluginInfo('AbcExport',q=True,l=True):
+        try:
+            cmds.loadPlugin('AbcExport')
+        except:
+            raise Exception('Unable to load abcExport plugin!')
+
+def getUserSets(use_cache=True):
+    # GET the user created SETS in the scene
+    # cached only when the callbacks can tell us the scene changed
+    if use_cache and installSetsCallbacks():
+        if sets_cache["sets"] is None:
+            sets_cache["sets"] = getOutlinerSets()
+        user_sets = list(sets_cache["sets"])
+    else:
+        user_sets = getOutlinerSets()
+    for non_wanted_set in maya_standar_sets:
+        if non_wanted_set in user_sets:
+            user_sets.remove(non_wanted_set)
+    return user_sets
+
+def getDefaultExportsDirectory():
+    return cmds.workspace(q=True, fn=True)+"/exports/abc"
+
+def getFrameRange():
+    start =int (cmds.playbackOptions( query=True, animationStartTime=True ))
+    end = int(cmds.playbackOptions( query=True, animationEndTime=True ))
+    return start, end
+
+def cleanNotes(notes):
+    # log is written with windows line ends, and only ASCII
+    notes = '\r\n'+notes.replace('\n', '\r\n')
+    return ''.join([i if ord(i) < 128 else ' ' for i in notes])
+
+def getExportFileName(setName, namespaces_only=True):
+    if namespaces_only:
+        return setName.split(":")[0]
+    return setName.replace(":","_") # convert : in NameSpace to _
+
+def getSetMembers(setName):
+    cmds.select(setName,replace=True )
+    return cmds.ls(selection=True, long=True)
+
+def getExportProfiles():
+    """ All the export profiles: export_profiles plus the ones of the JSON file
+    in $GW_ALEMBIC_PROFILES ({name: {"flags", "step", ...}}, missing keys are
+    taken from "final"). A broken file is reported and ignored.
+    Only "final" writes to the exports root, the other profiles default to
+    the folder of their name: they must never replace the final latest files
+    """
+    profiles = dict((name, dict(export_profiles[name], name=name)) for name in export_profiles)
+    profiles_file = os.environ.get(profiles_variable)
+    if not profiles_file:
+        return profiles
+    try:
+        with open(profiles_file) as json_file:
+            extra = json.load(json_file)
+        for name in extra:
+            profiles[name] = dict(profiles.get(name, dict(profiles[default_profile], subdirectory=name)), **extra[name])
+            profiles[name]["name"] = name
+            if name != default_profile and not profiles[name]["subdirectory"]:
+                print("WARNING: export profile "+name+" cannot write to the exports root, it writes to "+name)
+                profiles[name]["subdirectory"] = name
+    except (IOError, OSError, ValueError, TypeError, AttributeError) as e:
+        print("WARNING: export profiles of "+profiles_file+" ignored: "+str(e))
+    return profiles
+
+def getExportProfile(profile=None):
+    """ Settings of ONE profile (a dict with "name"), by name. None = default_profile
+    """
+    profiles = getExportProfiles()
+    name = profile or default_profile
+    if name not in profiles:
+        raise ValueError("Unknown export profile: "+str(name)+" (profiles: "+", ".join(sorted(profiles))+")")
+    return profiles[name]
+
+def getProfileFolders():
+    # names taken in the exports root by the folders of the profiles
+    return set(profile["subdirectory"].replace("\\", "/").split("/")[0] for profile in getExportProfiles().values() if profile["subdirectory"])
+
+def getProfileDirectory(exportsSubdirectory, profile):
+    """ Exports root of the profile: previews never replace the "latest" of the
+    final caches. Raises ValueError if the folder is the one of a set ("layout:geo_set")
+    """
+    if not profile["subdirectory"]:
+        return exportsSubdirectory
+    folder = exportsSubdirectory+"/"+profile["subdirectory"]
+    name = os.path.basename(folder.rstrip("/"))
+    if os.path.isdir(folder) and any(getVersionNumber(entry, name) is not None for entry in os.listdir(folder)):
+        raise ValueError("Export profile "+profile["name"]+": "+folder+" is the folder of the exports of "+name)
+    return folder
+
+def getProfileReport(profile):
+    # "preview (-noNormals -worldSpace -dataFormat ogawa, step 1, namespaces stripped)", for the log
+    return (profile["name"]+" ("+profile["flags"]+", step "+str(profile["step"])
+            +(", namespaces stripped" if profile["strip_namespaces"] else "")+")")
+
+def getProfileFrames(start, end, profile):
+    # samples written with the "step" of the profile
+    return int((end-start)/float(profile["step"]))+1
+
+def buildAlembicCommand(roots, save_name, start, end, profile=None):
+    """ AbcExport job string for one set. Built with one join (linear time),
+    a warning is printed if it gets longer than max_command_length
+    "profile": settings of getExportProfile (flags, step, namespaces), default: alembic_flags
+    """
+    profile = profile or export_profiles[default_profile]
+    # populate "root" varialble with selected geometry
+    parts = ["-frameRange", str(start), str(end)]
+    if profile["step"] != 1 and start != end:
+        parts.append("-step "+str(profile["step"]))
+    parts.append(profile["flags"])
+    if profile["strip_namespaces"]:
+        parts.append("-stripNamespaces")
+    for element in roots:
+        parts.append("-root "+element)
+    parts.append("-file \""+save_name+"\"")
+    command = " ".join(parts)
+    if len(command) > max_command_length:
+        cmds.warning("AbcExport command for "+save_name+" is "+str(len(command)//1024)+" KB ("+str(len(roots))+" roots). Try \"Collapse roots\" or a smaller set")
+    return command
+
+def collapseRoots(roots):
+    """ Replaces roots by their parent when ALL the children of the parent are roots
+    (whole subtree selected and visible), up to the top of the hierarchy.
+    Fewer roots to write and to traverse, but the parent is written in the alembic too.
+    Children of every parent are queried only once, one call per level.
+    """
+    roots = list(roots)
+    children = {} # parent -> children without intermediate objects
+    while True:
+        rootSet = set(roots)
+        parents = []
+        for root in roots:
+            parent = root.rsplit("|", 1)[0]
+            if parent and parent not in parents:
+                parents.append(parent)
+        unknown = [parent for parent in parents if parent not in children]
+        if unknown:
+            for parent in unknown:
+                children[parent] = []
+            found = cmds.listRelatives(unknown, children=True, fullPath=True) or []
+            if found:
+                found = cmds.ls(found, long=True, noIntermediate=True) or []
+            for child in found:
+                parent = child.rsplit("|", 1)[0]
+                if parent in children:
+                    children[parent].append(child)
+        collapse = set()
+        for parent in parents:
+            if children[parent] and all(child in rootSet for child in children[parent]):
+                collapse.add(parent)
+        if not collapse:
+            return roots
+        collapsed = []
+        for root in roots:
+            parent = root.rsplit("|", 1)[0]
+            if parent in collapse:
+                if parent not in collapsed:
+                    collapsed.append(parent)
+            elif root not in collapsed:
+                collapsed.append(root)
+        roots = collapsed
+
+def getInstancedNodes():
+    # every instanced DAG path of the scene, in ONE call
+    return set(cmds.ls(instances=True, long=True) or [])
+
+def preflightRoots(members, instanced):
+    """ Checks the roots of ONE set before AbcExport runs, in one sweep over the members.
+    - SHAPE members are replaced by their transform (fixed)
+    - roots inside other roots are removed, AbcExport refuses them (fixed)
+    - roots with the same short name, AbcExport refuses them (error)
+    - instances inside the roots, not supported by Maya alembic (error)
+    - no roots at all, AbcExport would export the WHOLE scene (error)
+    Returns roots, fixes, errors
+    """
+    roots = []
+    fixes = []
+    errors = []
+    shapes = set(cmds.ls(members, shapes=True, long=True) or []) if members else set()
+    seen = set()
+    names = {} # short name index
+    for member in members:
+        if member in shapes:
+            transform = member.rsplit("|", 1)[0]
+            fixes.append("Shape "+member+" replaced by its transform "+transform)
+            member = transform
+        if not member or member in seen:
+            continue
+        seen.add(member)
+        roots.append(member)
+        names.setdefault(member.rsplit("|", 1)[-1], []).append(member)
+
+    # roots inside other roots
+    nested = set()
+    for root in roots:
+        path = root
+        while "|" in path:
+            path = path.rsplit("|", 1)[0]
+            if path in seen:
+                nested.add(root)
+                fixes.append("Root "+root+" removed, already inside "+path)
+                break
+    if nested:
+        roots = [root for root in roots if root not in nested]
+        for short in list(names):
+            names[short] = [root for root in names[short] if root not in nested]
+
+    for short in names:
+        if len(names[short]) > 1:
+            errors.append('Same name "'+short+'" in: '+", ".join(names[short]))
+
+    # instanced paths inside the roots (instance index)
+    inside = {}
+    for node in instanced:
+        path = node
+        while path:
+            if path in seen and path not in nested:
+                inside.setdefault(path, []).append(node)
+                break
+            path = path.rsplit("|", 1)[0] if "|" in path else ""
+    for root in roots:
+        if root in inside:
+            errors.append("Instances under "+root+": "+", ".join(sorted(inside[root])))
+
+    if not roots:
+        errors.append("No objects to export (empty set, or everything hidden)")
+    return roots, fixes, errors
+
+################################################################################
+def firstValue(value):
+    # some queries return [value]
+    if isinstance(value, (list, tuple)):
+        return value[0]
+    return value
+
+class FastBake(object):
+    """ Puts the scene in a fast "bake" state while AbcExport runs, and restores
+    EVERYTHING as it was on exit, even if the export raises an exception.
+    - viewport paused (no redraw, no HUD)
+    - undo off (the queue is kept, not flushed)
+    - auto key off
+    - cached playback off
+    - evaluation manager mode: "parallel", "serial", "off" (DG) or None to keep it
+    - current time back where it was
+    After the block: frames, seconds and framesPerSecond() for the log.
+
+        with FastBake(frames=100, evaluation_mode="parallel") as bake:
+            cmds.AbcExport(j=command)
+        print(bake.framesPerSecond())
+    """
+    def __init__(self, frames=0, evaluation_mode=None):
+        self.frames = frames
+        self.evaluation_mode = evaluation_mode
+        self.seconds = 0.0
+        self.restore = [] # functions to call on exit, in reverse order
+
+    def change(self, query, set_value, value):
+        """ Set a state with "set_value(value)" and remember how to put it back.
+        States that do not exist in this Maya (or in batch) are ignored
+        """
+        try:
+            old_value = query()
+            if old_value == value:
+                return
+            set_value(value)
+            self.restore.append(lambda: set_value(old_value))
+        except (RuntimeError, TypeError, ValueError, AttributeError):
+            pass
+
+    def keep(self, query, set_value):
+        # nothing to change now, only put it back on exit
+        try:
+            old_value = query()
+            self.restore.append(lambda: set_value(old_value))
+        except (RuntimeError, TypeError, ValueError, AttributeError):
+            pass
+
+    def __enter__(self):
+        self.keep(lambda: cmds.currentTime(q=True), lambda value: cmds.currentTime(value, update=False))
+        self.change(lambda: cmds.ogs(query=True, pause=True), lambda value: cmds.ogs(pause=True), True) # toggles
+        self.change(lambda: cmds.undoInfo(q=True, state=True), lambda value: cmds.undoInfo(stateWithoutFlush=value), False)
+        self.change(lambda: cmds.autoKeyframe(q=True, state=True), lambda value: cmds.autoKeyframe(state=value), False)
+        self.change(lambda: firstValue(cmds.evaluator(name="cache", q=True, enable=True)), lambda value: cmds.evaluator(name="cache", enable=value), False)
+        if self.evaluation_mode:
+            self.change(lambda: firstValue(cmds.evaluationManager(q=True, mode=True)), lambda value: cmds.evaluationManager(mode=value), self.evaluation_mode)
+        self.start_time = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.seconds = time.time()-self.start_time
+        while self.restore:
+            try:
+                self.restore.pop()()
+            except Exception as e:
+                print("FastBake: could not restore state: "+str(e))
+        return False
+
+    def framesPerSecond(self):
+        if not self.seconds:
+            return 0.0
+        return self.frames/self.seconds
+
+################################################################################
+animated_types = ["animCurve", "constraint", "expression", "motionPath", "time"]
+
+def getAnimatedNodes(nodes):
+    """ Nodes (of the list) driven by animation: curves, constraints, expressions,
+    motion paths or time (simulations, caches) in their history
+    One listHistory per node, history itself is not cached by Maya
+    """
+    animated = set()
+    for node in nodes:
+        history = cmds.listHistory(node) or []
+        if history and cmds.ls(history, type=animated_types):
+            animated.add(node)
+    return animated
+
+def getDeformedShapes(shapes):
+    # shapes with deformers (skin, blend shapes...) or animated nodes in their history
+    deformed = set()
+    for shape in shapes:
+        history = cmds.listHistory(shape, pruneDagObjects=True) or []
+        if history and cmds.ls(history, type=["geometryFilter"]+animated_types):
+            deformed.add(shape)
+    return deformed
+
+def getSampleHash(roots, shapes):
+    # world matrices of the roots and world points of the shapes at the current frame
+    md5 = hashlib.md5()
+    for root in roots:
+        md5.update(repr(cmds.xform(root, q=True, worldSpace=True, matrix=True)).encode("utf-8"))
+    for shape in shapes:
+        try:
+            md5.update(repr(cmds.xform(shape+".cp[*]", q=True, worldSpace=True, translation=True)).encode("utf-8"))
+        except (RuntimeError, ValueError):
+            pass
+    return md5.hexdigest()
+
+def classifyMembers(roots, start, end, samples=0):
+    """ Sorts the roots in "static", "transform" (only moves) and "deforming".
+    - transform: animation on the root, on one of its parents (world space) or
+      on a transform below it
+    - deforming: a shape below it has deformers or animation in its history
+    With "samples" > 1 the roots that look animated are checked at that many
+    frames of the range: if nothing moves at all, they are static after all.
+    Returns {root: class}
+    """
+    classes = {}
+    if not roots:
+        return classes
+    shapes = []
+    transforms = []
+    descendants = cmds.listRelatives(roots, allDescendents=True, fullPath=True) or []
+    if descendants:
+        shapes = cmds.ls(descendants, long=True, shapes=True, noIntermediate=True) or []
+        transforms = cmds.ls(descendants, long=True, transforms=True) or []
+    # what is below each root (roots are never inside other roots, see preflightRoots)
+    rootSet = set(roots)
+    root_shapes = dict((root, []) for root in roots)
+    root_transforms = dict((root, []) for root in roots)
+    for nodes, below in [(shapes, root_shapes), (transforms, root_transforms)]:
+        for node in nodes:
+            path = node.rsplit("|", 1)[0]
+            while path and path not in rootSet:
+                path = path.rsplit("|", 1)[0]
+            if path:
+                below[path].append(node)
+    # parents are checked once, shared by many roots
+    parents = set()
+    for root in roots:
+        path = root.rsplit("|", 1)[0]
+        while path:
+            parents.add(path)
+            path = path.rsplit("|", 1)[0]
+    animated = getAnimatedNodes(list(roots)+sorted(parents)+transforms)
+    deformed = getDeformedShapes(shapes)
+
+    for root in roots:
+        if any(shape in deformed for shape in root_shapes[root]):
+            classes[root] = "deforming"
+            continue
+        moving = root in animated or any(node in animated for node in root_transforms[root])
+        path = root.rsplit("|", 1)[0]
+        while path and not moving:
+            moving = path in animated
+            path = path.rsplit("|", 1)[0]
+        classes[root] = "transform" if moving else "static"
+
+    # sampled check of the ones that look animated
+    suspects = [root for root in roots if classes[root] != "static"]
+    if samples > 1 and suspects and end > start:
+        frames = sorted(set(int(start+(end-start)*i/(samples-1)) for i in range(samples)))
+        hashes = dict((root, set()) for root in suspects)
+        current = cmds.currentTime(q=True)
+        try:
+            for frame in frames:
+                cmds.currentTime(frame, update=True)
+                for root in suspects:
+                    hashes[root].add(getSampleHash([root], root_shapes[root]))
+        finally:
+            cmds.currentTime(current, update=True)
+        for root in suspects:
+            if len(hashes[root]) == 1:
+                classes[root] = "static"
+    return classes
+
+################################################################################
+def getReferencesHash():
+    """ Hash of the referenced files of the scene (path, size and date), one for all sets
+    """
+    md5 = hashlib.md5()
+    for reference in sorted(cmds.file(q=True, reference=True) or []):
+        path = reference.split("{")[0] # copy number: "rig.ma{1}"
+        md5.update(reference.encode("utf-8"))
+        try:
+            status = os.stat(path)
+            md5.update((str(status.st_size)+" "+str(status.st_mtime)).encode("utf-8"))
+        except OSError:
+            md5.update(b"missing")
+    return md5.hexdigest()
+
+def getCurvesHash(roots):
+    """ Hash of the animation curves upstream of the roots, of what is below them and
+    of their parents (exported in world space): keys, values and tangents.
+    The curves are queried all together, a few calls for the whole set
+    """
+    md5 = hashlib.md5()
+    curves = []
+    if roots:
+        parents = set()
+        for root in roots:
+            path = root.rsplit("|", 1)[0]
+            while path:
+                parents.add(path)
+                path = path.rsplit("|", 1)[0]
+        history = cmds.listHistory((cmds.ls(roots, dag=True, long=True) or [])+sorted(parents)) or []
+        if history:
+            curves = sorted(set(cmds.ls(history, type="animCurve") or []))
+    md5.update(" ".join(curves).encode("utf-8"))
+    if curves:
+        md5.update(repr(cmds.keyframe(curves, q=True, timeChange=True, valueChange=True)).encode("utf-8"))
+        md5.update(repr(cmds.keyTangent(curves, q=True, inAngle=True, outAngle=True, inWeight=True, outWeight=True)).encode("utf-8"))
+    return md5.hexdigest()
+
+def getFingerprint(roots, start, end, frames_per_second, references_hash, options=""):
+    """ Fingerprint of everything that goes in the alembic of ONE set.
+    Changes WITHOUT keys (a moved prop, a new constraint) are NOT seen: use "force"
+    "options": anything else that changes the output
+    """
+    md5 = hashlib.md5()
+    for part in [software_version, alembic_flags, options, str(start), str(end), str(frames_per_second), references_hash, getCurvesHash(roots)]+list(roots):
+        md5.update(part.encode("utf-8"))
+        md5.update(b"\n")
+    return md5.hexdigest()
+
+def readFingerprints(directory_of_alembics, file_name):
+    # {set: {"fingerprint", "version", "version_name"}} of the last successful exports
+    try:
+        with open(directory_of_alembics+"/"+file_name+".fingerprint") as fingerprint_file:
+            return json.load(fingerprint_file)
+    except (IOError, OSError, ValueError):
+        return {}
+
+def writeFingerprint(directory_of_alembics, file_name, setName, fingerprint, version, version_name, static_version_name=None):
+    fingerprints = readFingerprints(directory_of_alembics, file_name)
+    fingerprints[setName] = {"fingerprint": fingerprint, "version": version, "version_name": version_name,
+                             "static_version_name": static_version_name}
+    temp_name = directory_of_alembics+"/"+file_name+".fingerprint"+str(os.getpid())
+    with open(temp_name, "w") as fingerprint_file:
+        json.dump(fingerprints, fingerprint_file, indent=1)
+    os.replace(temp_name, directory_of_alembics+"/"+file_name+".fingerprint")
+
+def buildExportJobs(sets_to_export, exportsSubdirectory, start, end, namespaces_only=True, export_only_visible=True, collapse_roots=False, force=False,
+                    static_once=False, static_samples=0, timer=None, profile=None, fingerprint_options=""):
+    """ One AbcExport job per set. Returns a list of dicts with
+    "set", "file_name", "save_name" (latest), "directory", "version",
+    "version_name" (the file AbcExport writes), "command", "roots",
+    "fixes" and "errors" (pre-flight check, jobs with errors must not be exported),
+    "roots_in" and "roots_out" (number of roots before and after collapsing),
+    "fingerprint" and "reused" (True if the last export has the same fingerprint,
+    nothing to export unless "force"),
+    "classes" (static / transform / deforming counts), "static_command",
+    "static_version_name" and "static_save_name" (static objects written once,
+    with "static_once"), "members" (count), "stages" (StageTimer.stages of the set)
+    and "profile" (settings of the export profile, see getExportProfile).
+    Stages shared by all sets go to "timer". "fingerprint_options": how the
+    caller writes the files (sharded...), a version is only reused by the same kind of export.
+    "exportsSubdirectory" is used as it is, see getProfileDirectory for the folder of a profile
+    """
+    jobs = []
+    timer = timer or StageTimer()
+    if not isinstance(profile, dict):
+        profile = getExportProfile(profile)
+    profile_folders = getProfileFolders()
+    with timer.stage("scene_scan"):
+        visibility = VisibilityResolver()
+        instanced = getInstancedNodes()
+        frames_per_second = cmds.currentUnit(query=True, time=True)
+        references_hash = getReferencesHash()
+    for currentSet in sets_to_export:
+        set_timer = StageTimer()
+        with set_timer.stage("members"):
+            selected_meshes = getSetMembers(currentSet)
+        members = len(selected_meshes)
+        #get selected AND visible objects
+        if export_only_visible:
+            queried = visibility.queried
+            with set_timer.stage("visibility"):
+                selected_meshes = visibility.filterVisible(selected_meshes)
+            print("Visible: "+str(len(selected_meshes))+"/"+str(members)+" members, "+str(visibility.queried-queried)+" DAG nodes queried")
+
+        roots_in = len(selected_meshes)
+        if collapse_roots:
+            with set_timer.stage("collapse"):
+                selected_meshes = collapseRoots(selected_meshes)
+            print("Roots: "+str(roots_in)+" --> "+str(len(selected_meshes)))
+
+        # PRE-FLIGHT, do not waste evaluation time on exports that will fail
+        with set_timer.stage("preflight"):
+            selected_meshes, fixes, errors = preflightRoots(selected_meshes, instanced)
+        for fix in fixes:
+            print("PRE-FLIGHT "+currentSet+" fixed: "+fix)
+        for error in errors:
+            cmds.warning("PRE-FLIGHT "+currentSet+" rejected: "+error)
+
+        file_name = getExportFileName(currentSet, namespaces_only)
+        if not profile["subdirectory"] and file_name in profile_folders:
+            errors.append("Name "+file_name+" is taken by the folder of an export profile, use full names or rename the namespace")
+            cmds.warning("PRE-FLIGHT "+currentSet+" rejected: "+errors[-1])
+        save_name = exportsSubdirectory+"/"+file_name+".abc"
+        # the VERSION is written by AbcExport, "latest" is published from it
+        directory_of_alembics = exportsSubdirectory+"/"+file_name
+        if not os.path.exists(directory_of_alembics):
+            os.makedirs(directory_of_alembics)
+            print("Created directory at: "+directory_of_alembics+"\n")
+        job = {"set": currentSet, "file_name": file_name, "save_name": save_name, "directory": directory_of_alembics,
+               "version": "N/A", "version_name": None, "command": None, "roots": selected_meshes, "fixes": fixes, "errors": errors,
+               "roots_in": roots_in, "roots_out": len(selected_meshes), "fingerprint": None, "reused": False,
+               "classes": None, "static_command": None, "static_version_name": None, "static_save_name": None,
+               "members": members, "stages": set_timer.stages, "profile": profile}
+        jobs.append(job)
+        if errors:
+            continue
+
+        # same inputs as the last export? then reuse it
+        with set_timer.stage("fingerprint"):
+            fingerprint = getFingerprint(selected_meshes, start, end, frames_per_second, references_hash,
+                                         fingerprint_options+("static " if static_once else "")+getProfileReport(profile))
+            last = readFingerprints(directory_of_alembics, file_name).get(currentSet)
+        job["fingerprint"] = fingerprint
+        if not force and last and last["fingerprint"] == fingerprint and os.path.exists(last["version_name"]):
+            print("UNCHANGED "+currentSet+", reusing "+last["version"])
+            job["version"] = last["version"]
+            job["version_name"] = last["version_name"]
+            job["reused"] = True
+            if last.get("static_version_name") and os.path.exists(last["static_version_name"]):
+                job["static_version_name"] = last["static_version_name"]
+                job["static_save_name"] = exportsSubdirectory+"/"+file_name+"_static.abc"
+            continue
+
+        with set_timer.stage("version"):
+            version = reserveVersion_abc(directory_of_alembics, file_name)
+        version_name = directory_of_alembics+"/"+file_name+"_"+version+".abc"
+        job["version"] = version
+        job["version_name"] = version_name
+
+        # objects that never move are written ONCE
+        static_roots = []
+        if static_once:
+            with set_timer.stage("classify"):
+                classes = classifyMembers(selected_meshes, start, end, static_samples)
+            static_roots = [root for root in selected_meshes if classes[root] == "static"]
+            job["classes"] = dict((name, list(classes.values()).count(name)) for name in ["static", "transform", "deforming"])
+            print("Static: "+str(job["classes"]["static"])+" Transform only: "+str(job["classes"]["transform"])+" Deforming: "+str(job["classes"]["deforming"]))
+        # export to alembic command
+        if static_roots and len(static_roots) < len(selected_meshes):
+            moving_roots = [root for root in selected_meshes if classes[root] != "static"]
+            job["command"] = buildAlembicCommand(moving_roots, version_name, start, end, profile)
+            job["static_version_name"] = directory_of_alembics+"/"+file_name+"_"+version+"_static.abc"
+            job["static_save_name"] = exportsSubdirectory+"/"+file_name+"_static.abc"
+            job["static_command"] = buildAlembicCommand(static_roots, job["static_version_name"], start, start, profile)
+            print (job["static_command"]+"\r\n")
+        elif static_roots:
+            # nothing moves at all, one sample
+            job["command"] = buildAlembicCommand(selected_meshes, version_name, start, start, profile)
+        else:
+            job["command"] = buildAlembicCommand(selected_meshes, version_name, start, end, profile)
+        print (job["command"]+"\r\n")
+    return jobs
+
+def linkFile(source, destination):
+    """ Hardlink, then reflink (copy on write), then kernel side copy.
+    Returns the method used and the bytes copied
+    """
+    try:
+        os.link(source, destination)
+        return "hardlink", 0
+    except (OSError, AttributeError):
+        pass
+    size = os.path.getsize(source)
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            import fcntl
+            fcntl.ioctl(dst.fileno(), 0x40049409, src.fileno()) # FICLONE
+            return "reflink", 0
+        except (ImportError, OSError):
+            pass
+        # data does not go through python
+        copied = 0
+        for method in ("copy_file_range", "sendfile"):
+            if not hasattr(os, method):
+                continue
+            try:
+                while copied < size:
+                    if method == "copy_file_range":
+                        sent = os.copy_file_range(src.fileno(), dst.fileno(), size-copied)
+                    else:
+                        sent = os.sendfile(dst.fileno(), src.fileno(), copied, size-copied)
+                    if sent == 0:
+                        break
+                    copied += sent
+                if copied == size:
+                    return method, copied
+            except OSError:
+                if copied:
+                    raise
+        src.seek(0)
+        dst.seek(0)
+        shutil.copyfileobj(src, dst, 16*1024*1024)
+        return "copy", size
+
+def getOtherLatestFiles(save_name, static=False):
+    # a sharded export publishes <name>.manifest.json, the others <name>.abc
+    # (and <name>_static.abc): for one name only the last one published is current.
+    # "static": the export published a <name>_static.abc too
+    if save_name.endswith(".manifest.json"):
+        base = save_name[:-len(".manifest.json")]
+        return [base+".abc", base+"_static.abc"]
+    base = save_name[:-len(".abc")]
+    return [base+".manifest.json"]+([] if static else [base+"_static.abc"])
+
+def retireLatestFiles(save_name, static=False):
+    """ Removes the latest files of the other kind of export (getOtherLatestFiles),
+    and the <name>_static.abc of an earlier export when this one has no static file.
+    They are links of versions, the versions stay. Returns the log lines
+    """
+    lines = []
+    for name in getOtherLatestFiles(save_name, static):
+        if os.path.exists(name):
+            os.remove(name)
+            lines.append("Replaces latest   :"+name)
+    return lines
+
+def publishAlembic(version_name, save_name):
+    """ Publish the written VERSION as the "latest" file (save_name) without a
+    second full copy when possible. The latest file is replaced atomically.
+    Returns a dict with "method", "bytes_copied", "bytes_saved" and "seconds"
+    """
+    start_time = time.time()
+    temp_name = save_name+".publish"+str(os.getpid())
+    if os.path.exists(temp_name):
+        os.remove(temp_name)
+    try:
+        method, bytes_copied = linkFile(version_name, temp_name)
+        os.replace(temp_name, save_name)
+    except:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+    size = os.path.getsize(version_name)
+    print("PUBLISH ("+method+") // Source: "+version_name+" --> Latest: "+save_name+"\n")
+    return {"method": method, "bytes_copied": bytes_copied, "bytes_saved": size-bytes_copied, "seconds": time.time()-start_time}
+
+def writeExportLog(directory_of_alembics, file_name, lines):
+    """ Append one entry to the log of the set. "lines" without line ends
+    """
+    now = datetime.datetime.now()
+    log_file = open(directory_of_alembics+"/"+file_name+".log", "a+")
+    log_file.write("------------------------------------------------------------------------------\r\n")
+    log_file.write(str(now.strftime("%Y-%m-%d %H:%M"))+"\r\n")
+    for line in lines:
+        log_file.write(line+"\r\n")
+    log_file.close()
+
+################################################################################
+# TELEMETRY: one JSON record per set and export in <name>/<name>.jsonl
+# (gw_alembic_stats.py sums them up)
+
+class StageTimer(object):
+    """ Wall clock and CPU seconds of named stages:
+        timer = StageTimer()
+        with timer.stage("abc_export"):
+            ...
+    A stage that runs again adds up. "stages" is {name: {"wall": s, "cpu": s}}
+    CPU is the time of THIS process (mayapy workers of a sharded export not included)
+    "stages" can be given to keep adding to an existing dict (job["stages"])
+    """
+    def __init__(self, stages=None):
+        self.stages = {} if stages is None else stages
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            total = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+            total["wall"] += time.perf_counter()-wall
+            total["cpu"] += time.process_time()-cpu
+
+@contextlib.contextmanager
+def exportHooks(jobs):
+    """ Enters every hook of "export_hooks" around the AbcExport call of "jobs"
+    """
+    with contextlib.ExitStack() as stack:
+        for hook in export_hooks:
+            stack.enter_context(hook(jobs))
+        yield
+
+def mayaProfilerHook(output_name, buffer_size=20):
+    """ Export hook: records the AbcExport call with the Maya profiler, open
+    "output_name" in Windows > General Editors > Profiler.
+        core.export_hooks.append(core.mayaProfilerHook("/tmp/abc_export.prof"))
+    """
+    @contextlib.contextmanager
+    def hook(jobs):
+        cmds.profiler(bufferSize=buffer_size)
+        cmds.profiler(sampling=True)
+        try:
+            yield
+        finally:
+            cmds.profiler(sampling=False)
+            cmds.profiler(output=output_name)
+    return hook
+
+def cProfileHook(stats_name):
+    """ Export hook: python profile (cProfile) of the AbcExport call, for pstats
+    """
+    import cProfile
+    @contextlib.contextmanager
+    def hook(jobs):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(stats_name)
+    return hook
+
+def getOutputBytes(job):
+    # bytes written by the job: version file and static file
+    size = 0
+    for output in [job["version_name"], job["static_version_name"]]:
+        if output and os.path.exists(output):
+            size += os.path.getsize(output)
+    return size
+
+def getTelemetryRecord(job, status, context, pass_stats):
+    """ Telemetry of ONE set. "context": what is the same for every set of the
+    export (export_id, user, scene, frames...). "pass_stats": the export the set
+    was in, "sets", "bytes" and "stages" ({name: {"wall", "cpu"}} shared by all
+    its sets: scene_scan, bake, abc_export). MB/s is for the whole AbcExport pass,
+    one pass writes many sets. The stages of the set itself come from the job
+    """
+    record = dict(context)
+    pass_seconds = pass_stats["stages"].get("abc_export", {"wall": 0.0})["wall"]
+    megabytes_per_second = 0.0
+    if pass_seconds > 0:
+        megabytes_per_second = pass_stats["bytes"]/(1024.0*1024.0)/pass_seconds
+    record.update({
+        "schema": telemetry_version,
+        "time": datetime.datetime.now().isoformat(),
+        "software": software_version,
+        "set": job["set"],
+        "version": job["version"] if status in ["saved", "reused"] else None,
+        "status": status, # saved, reused, rejected or failed
+        "members": job.get("members", 0),
+        "roots_in": job["roots_in"],
+        "roots_out": job["roots_out"],
+        "static": job["classes"],
+        "bytes": getOutputBytes(job) if status == "saved" else 0,
+        "pass_sets": pass_stats["sets"],
+        "pass_bytes": pass_stats["bytes"],
+        "pass_seconds": pass_seconds,
+        "pass_stages": pass_stats["stages"],
+        "mb_per_s": megabytes_per_second,
+        "stages": job.get("stages", {}),
+    })
+    return record
+
+def writeTelemetry(directory_of_alembics, file_name, record):
+    """ Append one record (one line of JSON) to <name>.jsonl of the set
+    """
+    with open(directory_of_alembics+"/"+file_name+".jsonl", "a") as telemetry_file:
+        telemetry_file.write(json.dumps(record, sort_keys=True)+"\n")
+
+################################################################################
+# ASYNC PUBLISH: AbcExport writes to local scratch, a pool of threads moves the
+# files to the share, publishes the latest and writes fingerprint, log and
+# telemetry. Every task stays in a journal file until it is done, so a crash
+# (or closing Maya) never loses it: the next Publisher finishes it.
+# NO maya.cmds in here, it runs in background threads.
+
+scratch_journal_name = "journal"
+publishers = {} # scratch directory --> Publisher
+
+def getDefaultScratchDirectory():
+    return os.environ.get("GW_ALEMBIC_SCRATCH") or os.path.join(tempfile.gettempdir(), "gw_alembic_scratch")
+
+def getFileHash(name, block_size=8*1024*1024):
+    # sha256 of a file, read in blocks
+    file_hash = hashlib.sha256()
+    with open(name, "rb") as hashed_file:
+        for block in iter(lambda: hashed_file.read(block_size), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+def copyWithChecksum(source, destination, verify=True, block_size=8*1024*1024):
+    """ Streams source to destination+".part", sha256 computed on the way, then
+    renames it. "verify": the copy is read back and its sha256 compared.
+    Returns sha256, bytes
+    """
+    part_name = destination+".part"
+    source_hash = hashlib.sha256()
+    size = 0
+    try:
+        with open(source, "rb") as source_file, open(part_name, "wb") as part_file:
+            for block in iter(lambda: source_file.read(block_size), b""):
+                source_hash.update(block)
+                part_file.write(block)
+                size += len(block)
+            part_file.flush()
+            os.fsync(part_file.fileno())
+        if verify and getFileHash(part_name, block_size) != source_hash.hexdigest():
+            raise IOError("Checksum mismatch copying "+source+" to "+destination)
+        os.replace(part_name, destination)
+    except:
+        if os.path.exists(part_name):
+            os.remove(part_name)
+        raise
+    return source_hash.hexdigest(), size
+
+################################################################################
+# DEDUPE STORE: every version is a hardlink of an object named by its sha256 in
+# <exports>/.gw_store/objects, identical versions take the space of one.
+# Retention and garbage collection: gw_alembic_store.py
+
+def getStoreDirectory(exportsSubdirectory):
+    return exportsSubdirectory+"/"+store_directory_name
+
+def getObjectName(store_directory, digest):
+    return store_directory+"/objects/"+digest[:2]+"/"+digest[2:]+".abc"
+
+def storeFile(file_name, store_directory):
+    """ Puts the file in the store: new content is linked in, known content
+    replaces the file with a link of the stored object (atomically).
+    The hash is read in blocks, never the whole file in memory.
+    Returns sha256, bytes saved (the size of the file if the content was known)
+    Raises OSError if the file system has no hardlinks
+    """
+    digest = getFileHash(file_name)
+    object_name = getObjectName(store_directory, digest)
+    if os.path.exists(object_name) and os.path.samefile(object_name, file_name):
+        return digest, 0
+    if not os.path.exists(os.path.dirname(object_name)):
+        os.makedirs(os.path.dirname(object_name), exist_ok=True)
+    try:
+        os.link(file_name, object_name)
+        return digest, 0
+    except OSError:
+        if not os.path.exists(object_name):
+            raise
+    # same content already stored (maybe by another export right now)
+    size = os.path.getsize(file_name)
+    temp_name = file_name+".store"+str(os.getpid())
+    os.link(object_name, temp_name)
+    os.replace(temp_name, file_name)
+    return digest, size
+
+def storeJobFiles(version_names, store_directory):
+    """ storeFile for the files of one export. Returns the log lines and
+    {file: sha256}
+    """
+    lines = []
+    digests = {}
+    for version_name in version_names:
+        try:
+            digest, saved = storeFile(version_name, store_directory)
+        except (OSError, IOError) as e:
+            print("WARNING: "+version_name+" not deduplicated: "+str(e))
+            lines.append("Store: "+os.path.basename(version_name)+" NOT deduplicated: "+str(e))
+            continue
+        if saved:
+            lines.append("Store: "+os.path.basename(version_name)+" sha256 "+digest+" same as a stored version, "+str(saved)+" bytes saved")
+        else:
+            lines.append("Store: "+os.path.basename(version_name)+" sha256 "+digest+" new content")
+        digests[version_name] = digest
+    return lines, digests
+
+################################################################################
+# CATALOG: SQLite index of the exports in the exports root, so tools can ask
+# "latest version of X" or "all caches of scene Y" without listing folders.
+# Paths are relative to the exports root (the same share has different mounts).
+# No WAL: it does not work on network file systems. A catalog that cannot be
+# written never fails an export, "gw_alembic_catalog.py rebuild" fixes it from the logs
+
+def openCatalog(exportsSubdirectory, catalog_file=None):
+    connection = sqlite3.connect(catalog_file or exportsSubdirectory+"/"+catalog_name, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=DELETE")
+    connection.execute("CREATE TABLE IF NOT EXISTS caches (id INTEGER PRIMARY KEY, "
+                       +", ".join('"'+column+'"' for column in catalog_columns)+", UNIQUE(path))")
+    # catalogs of older versions get the new columns (empty in their rows)
+    columns = [row["name"] for row in connection.execute("PRAGMA table_info(caches)")]
+    for column in catalog_columns:
+        if column not in columns:
+            connection.execute('ALTER TABLE caches ADD COLUMN "'+column+'"')
+    connection.execute("CREATE INDEX IF NOT EXISTS caches_name ON caches (name, version_number)")
+    connection.execute("CREATE INDEX IF NOT EXISTS caches_set ON caches (set_name, version_number)")
+    connection.execute("CREATE INDEX IF NOT EXISTS caches_scene ON caches (scene)")
+    return connection
+
+def getNamespace(setName):
+    # "charA:geo_set" --> "charA", no namespace --> ""
+    return setName.rsplit(":", 1)[0] if ":" in setName else ""
+
+def getCatalogPath(exportsSubdirectory, path):
+    if not path:
+        return None
+    return os.path.relpath(path, exportsSubdirectory).replace("\\", "/")
+
+def getCatalogEntry(job, version_name, save_name, start, end, frames_per_second, scene_path, user, host, notes, sha256=None):
+    """ Catalog row of one saved export (paths still absolute, recordCatalog
+    makes them relative)
+    """
+    size = 0
+    for name in [version_name, job.get("share_static_version_name", job["static_version_name"])]:
+        if name and os.path.exists(name):
+            size += os.path.getsize(name)
+    return {"name": job["file_name"], "set_name": job["set"], "namespace": getNamespace(job["set"]),
+            "version": job["version"], "version_number": getVersionNumber(os.path.basename(version_name), job["file_name"]),
+            "path": version_name, "latest_path": save_name, "static_path": job.get("share_static_version_name", job["static_version_name"]),
+            "start": float(start), "end": float(end), "fps": frames_per_second, "scene": scene_path, "size": size, "sha256": sha256,
+            "user": user, "host": host, "notes": notes.replace("\r\n", "\n").strip(), "exported": datetime.datetime.now().isoformat(),
+            "profile": job["profile"]["name"]}
+
+def recordCatalog(exportsSubdirectory, entries, catalog_file=None):
+    """ Adds (or replaces, same path) exports in the catalog. Never raises:
+    the export is done, the catalog can be rebuilt
+    """
+    try:
+        connection = openCatalog(exportsSubdirectory, catalog_file)
+        try:
+            with connection:
+                for entry in entries:
+                    entry = dict(entry)
+                    for key in ["path", "latest_path", "static_path"]:
+                        entry[key] = getCatalogPath(exportsSubdirectory, entry[key])
+                    connection.execute("INSERT OR REPLACE INTO caches ("+", ".join('"'+column+'"' for column in catalog_columns)+") VALUES ("
+                                       +", ".join("?" for column in catalog_columns)+")", [entry.get(column) for column in catalog_columns])
+        finally:
+            connection.close()
+        return True
+    except sqlite3.Error as e:
+        print("WARNING: export catalog not updated: "+str(e))
+        return False
+
+def removeFromCatalog(exportsSubdirectory, paths):
+    # versions deleted from disk (pruned)
+    if not os.path.exists(exportsSubdirectory+"/"+catalog_name):
+        return
+    try:
+        connection = openCatalog(exportsSubdirectory)
+        try:
+            with connection:
+                connection.executemany("DELETE FROM caches WHERE path = ?", [[getCatalogPath(exportsSubdirectory, path)] for path in paths])
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        print("WARNING: export catalog not updated: "+str(e))
+
+def getCatalogRows(exportsSubdirectory, where="", values=(), order="name, version_number"):
+    """ Rows of the catalog as dicts, paths made absolute again
+    """
+    if not os.path.exists(exportsSubdirectory+"/"+catalog_name):
+        return []
+    connection = openCatalog(exportsSubdirectory)
+    try:
+        rows = [dict(row) for row in connection.execute("SELECT * FROM caches "+(("WHERE "+where) if where else "")+" ORDER BY "+order, values)]
+    finally:
+        connection.close()
+    for row in rows:
+        for key in ["path", "latest_path", "static_path"]:
+            if row[key]:
+                row[key] = os.path.join(exportsSubdirectory, row[key]).replace("\\", "/")
+    return rows
+
+def getLatestCache(exportsSubdirectory, name):
+    """ Latest version of "name" (file name, set or namespace), None if never exported.
+    Versions are counted per file name: a set or a namespace exported under
+    several file names (--full-names) raises a ValueError listing them
+    """
+    order = "version_number DESC, exported DESC"
+    rows = getCatalogRows(exportsSubdirectory, "name = ?", [name], order=order)
+    if not rows:
+        rows = getCatalogRows(exportsSubdirectory, "set_name = ? OR namespace = ?", [name, name], order=order)
+    names = sorted(set(row["name"] for row in rows))
+    if len(names) > 1:
+        raise ValueError(name+" matches several exports: "+", ".join(names))
+    return rows[0] if rows else None
+
+def findCaches(exportsSubdirectory, name=None, namespace=None, scene=None):
+    """ All the exports matching every filter given. "scene": full path or
+    just the file name of the Maya scene
+    """
+    conditions = []
+    values = []
+    if name:
+        conditions.append("(name = ? OR set_name = ?)")
+        values += [name, name]
+    if namespace is not None:
+        conditions.append("namespace = ?")
+        values.append(namespace)
+    if scene:
+        conditions.append("(scene = ? OR scene LIKE ?)")
+        values += [scene, "%/"+scene]
+    return getCatalogRows(exportsSubdirectory, " AND ".join(conditions), values)
+
+def writeJournal(journal_directory, task):
+    # one file per task, replaced atomically
+    temp_name = os.path.join(journal_directory, task["id"]+".tmp")
+    with open(temp_name, "w") as journal_file:
+        json.dump(task, journal_file)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+    os.replace(temp_name, os.path.join(journal_directory, task["id"]+".json"))
+
+def readJournal(journal_directory):
+    tasks = []
+    for name in sorted(os.listdir(journal_directory)):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(journal_directory, name)) as journal_file:
+                    tasks.append(json.load(journal_file))
+            except ValueError:
+                print("Broken journal entry skipped: "+name)
+    return tasks
+
+def moveJobToScratch(job, scratch_folder):
+    """ The AbcExport job writes in "scratch_folder" instead of the share.
+    The share names are kept in "share_version_name" and "share_static_version_name"
+    """
+    if not os.path.exists(scratch_folder):
+        os.makedirs(scratch_folder)
+    job["share_version_name"] = job["version_name"]
+    job["share_static_version_name"] = job["static_version_name"]
+    for name_key, command_key in [("version_name", "command"), ("static_version_name", "static_command")]:
+        if job[name_key]:
+            scratch_name = scratch_folder+"/"+os.path.basename(job[name_key])
+            if job[command_key]:
+                job[command_key] = job[command_key].replace('-file "'+job[name_key]+'"', '-file "'+scratch_name+'"')
+            job[name_key] = scratch_name
+
+class Publisher(object):
+    """ Background publish of the files exported to local scratch.
+    "workers" transfers at the same time, "retries" more attempts for each one
+    (waiting "retry_delay" seconds, then twice as long...), "verify" reads the
+    copy back for the checksum.
+    status() for the UI, wait() blocks until everything is done.
+    Use getPublisher(), one per scratch directory and process
+    """
+    def __init__(self, scratch_directory, workers=2, retries=3, retry_delay=2.0, verify=True):
+        self.scratch_directory = scratch_directory
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.verify = verify
+        # own journal folder, locked while this process lives
+        self.journal_directory = os.path.join(scratch_directory, scratch_journal_name, socket.gethostname()+"-"+str(os.getpid()))
+        if not os.path.exists(self.journal_directory):
+            os.makedirs(self.journal_directory)
+        self.owner_lock = open(os.path.join(self.journal_directory, ".lock"), "a+")
+        lockFile(self.owner_lock)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.lock = threading.Lock() # fingerprint, log and telemetry of sets sharing a folder
+        self.tasks = {} # id --> status
+        self.futures = []
+
+    def submit(self, task):
+        """ Journal the task, then queue it
+        """
+        task["state"] = "pending"
+        writeJournal(self.journal_directory, task)
+        self.tasks[task["id"]] = {"set": task["set"], "version": task["version"], "state": "pending", "attempts": 0,
+                                  "error": None, "bytes": 0, "seconds": 0.0}
+        self.futures.append(self.pool.submit(self.run, task))
+
+    def resume(self):
+        """ Adopts the journal of dead processes (their lock is free) and queues
+        their tasks again. Returns the number of tasks resumed
+        """
+        resumed = 0
+        journal_root = os.path.dirname(self.journal_directory)
+        for folder in sorted(os.listdir(journal_root)):
+            journal_directory = os.path.join(journal_root, folder)
+            if journal_directory == self.journal_directory or not os.path.isdir(journal_directory):
+                continue
+            lock_file = open(os.path.join(journal_directory, ".lock"), "a+")
+            try:
+                try:
+                    lockFile(lock_file, wait=False)
+                except (OSError, IOError):
+                    continue # alive
+                for task in readJournal(journal_directory):
+                    print("RESUME publish of "+task["set"]+" "+task["version"]+" ("+task.get("state", "pending")+")")
+                    self.submit(task)
+                    os.remove(os.path.join(journal_directory, task["id"]+".json"))
+                    resumed += 1
+                unlockFile(lock_file)
+            finally:
+                lock_file.close()
+            shutil.rmtree(journal_directory, ignore_errors=True)
+        return resumed
+
+    def run(self, task):
+        status = self.tasks[task["id"]]
+        start_time = time.perf_counter()
+        missing = [scratch_name for scratch_name, share_name in task["files"]
+                   if not os.path.exists(scratch_name) and not os.path.exists(share_name)]
+        if missing:
+            status["state"] = "lost"
+            status["error"] = "Scratch files missing: "+", ".join(missing)
+            print("WARNING: publish of "+task["set"]+" "+task["version"]+" lost, "+status["error"])
+            self.forget(task)
+            return False
+        for attempt in range(self.retries+1):
+            status["state"] = "transferring"
+            status["attempts"] = attempt+1
+            status["bytes"] = 0 # copied again by every attempt
+            try:
+                self.transfer(task, status)
+                break
+            except (OSError, IOError) as e:
+                status["error"] = str(e)
+                print("WARNING: publish of "+task["set"]+" "+task["version"]+" failed (attempt "+str(attempt+1)+"): "+str(e))
+                if attempt == self.retries:
+                    status["state"] = "failed"
+                    task["state"] = "failed"
+                    task["error"] = str(e)
+                    writeJournal(self.journal_directory, task) # the next session tries again
+                    return False
+                time.sleep(self.retry_delay*2**attempt)
+        status["seconds"] = time.perf_counter()-start_time
+        status["state"] = "done"
+        self.forget(task)
+        for scratch_name, share_name in task["files"]:
+            if os.path.exists(scratch_name):
+                os.remove(scratch_name)
+        try:
+            os.rmdir(task["scratch_folder"])
+        except OSError:
+            pass # other sets of the same export still there
+        return True
+
+    def transfer(self, task, status):
+        """ Copy with checksum, publish the latest, then fingerprint, log and telemetry
+        """
+        timer = StageTimer()
+        checksums = {}
+        with timer.stage("transfer"):
+            for scratch_name, share_name in task["files"]:
+                if not os.path.exists(scratch_name):
+                    continue # copied before a crash
+                checksums[share_name], size = copyWithChecksum(scratch_name, share_name, self.verify)
+                status["bytes"] += size
+        store_lines = []
+        if task.get("store_directory"):
+            with timer.stage("store"):
+                store_lines, digests = storeJobFiles([share_name for scratch_name, share_name in task["files"]], task["store_directory"])
+                checksums.update(digests)
+        with timer.stage("publish"):
+            publish = publishAlembic(task["version_name"], task["save_name"])
+            if task["static_version_name"]:
+                publishAlembic(task["static_version_name"], task["static_save_name"])
+            retired = retireLatestFiles(task["save_name"], bool(task["static_version_name"]))
+        seconds = timer.stages["transfer"]["wall"]
+        lines = list(task["lines"])
+        lines.append("Published as      :"+publish["method"]+" Bytes copied: "+str(publish["bytes_copied"])+" Bytes not copied: "+str(publish["bytes_saved"])+" Seconds: "+"%.3f" % publish["seconds"])
+        lines.extend(retired)
+        lines.append("Transfer from scratch: "+str(status["bytes"])+" bytes in "+"%.3f" % seconds+" s, attempts: "+str(status["attempts"]))
+        lines.extend("Checksum: "+os.path.basename(name)+" sha256 "+checksums[name] for name in sorted(checksums) if not task.get("store_directory"))
+        lines.extend(store_lines)
+        record = dict(task["record"])
+        record["stages"] = dict(record["stages"], **timer.stages)
+        record["transfer_attempts"] = status["attempts"]
+        with self.lock:
+            if task["fingerprint"]:
+                writeFingerprint(task["directory"], task["file_name"], task["set"], task["fingerprint"], task["version"],
+                                 task["version_name"], task["static_version_name"])
+            writeExportLog(task["directory"], task["file_name"], lines+task["tail"])
+            writeTelemetry(task["directory"], task["file_name"], record)
+        if task.get("catalog"):
+            size = sum(os.path.getsize(name) for name in [task["version_name"], task["static_version_name"]] if name and os.path.exists(name))
+            recordCatalog(task["exports_directory"], [dict(task["catalog"], sha256=checksums.get(task["version_name"]), size=size)])
+
+    def forget(self, task):
+        journal_name = os.path.join(self.journal_directory, task["id"]+".json")
+        if os.path.exists(journal_name):
+            os.remove(journal_name)
+
+    def status(self):
+        # copy of the status of every task: set, version, state, attempts, error, bytes, seconds
+        return [dict(self.tasks[task_id], id=task_id) for task_id in sorted(self.tasks)]
+
+    def pending(self):
+        return len([status for status in self.tasks.values() if status["state"] in ["pending", "transferring"]])
+
+    def wait(self):
+        """ Blocks until all the tasks are done. Returns the status of the failed ones
+        """
+        for future in list(self.futures):
+            future.result()
+        return [status for status in self.status() if status["state"] in ["failed", "lost"]]
+
+def getPublisher(scratch_directory=None, **options):
+    """ THE Publisher of the scratch directory in this process. The first call
+    also finishes the publishes left behind by dead processes
+    """
+    scratch_directory = scratch_directory or getDefaultScratchDirectory()
+    if scratch_directory not in publishers:
+        publisher = Publisher(scratch_directory, **options)
+        publishers[scratch_directory] = publisher
+        publisher.resume()
+    return publishers[scratch_directory]
+
+def getTimingReport(stages):
+    # "name wall/cpu" of every stage, for the .log
+    return ", ".join(name+" "+"%.3f" % stages[name]["wall"]+"/"+"%.3f" % stages[name]["cpu"]+" cpu" for name in stages)
+
+def getExportId():
+    # groups the records of the sets exported together
+    return socket.gethostname()+"-"+str(os.getpid())+"-"+datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+
+################################################################################
+def splitFrameRange(start, end, chunks, handles=0, step=1):
+    """ Splits start-end in "chunks" parts for parallel exports.
+    Every chunk is written with "handles" extra frames on each side (overlap
+    with its neighbours for motion blur), never outside start-end.
+    With a "step" (export profiles) the chunks start and end on the frames one
+    export would sample (start + k*step), handles are rounded up to whole steps.
+    Returns a list of dicts: "chunk" (1, 2...), "frames" (first and last frame
+    sampled for the chunk) and "written" (frames written in its file)
+    """
+    samples = int((end-start)/float(step)+1e-6)+1
+    chunks = max(1, min(int(chunks), samples))
+    size = samples//chunks
+    extra = samples % chunks # the first chunks get one more sample
+    handle_samples = int(-(-handles//step))
+    frame = lambda sample: start+sample*step
+    ranges = []
+    first = 0
+    for chunk in range(chunks):
+        last = first+size-1+(1 if chunk < extra else 0)
+        ranges.append({"chunk": chunk+1, "frames": [frame(first), frame(last)],
+                       "written": [frame(max(0, first-handle_samples)), frame(min(samples-1, last+handle_samples))]})
+        first = last+1
+    return ranges
+
+def getChunkFileName(version_name, chunk):
+    # <name>_v001.abc --> <name>_v001_chunk02.abc
+    return version_name[:-len(".abc")]+"_chunk"+str(chunk).zfill(2)+".abc"
+
+def writeChunkManifest(manifest_name, setName, version, ranges, chunk_files, start, end, frames_per_second, handles, scene_path):
+    """ JSON file that lists the chunks of ONE export in order, so they can be
+    loaded as one sequence: for every chunk, the file, the frames to take from it
+    and its sha256 (the hash of the manifest stands for the whole export)
+    """
+    manifest = {
+        "set": setName,
+        "version": version,
+        "frame_range": [start, end],
+        "fps": frames_per_second,
+        "handles": handles,
+        "source_scene": scene_path,
+        "software": software_version,
+        "chunks": [{"file": os.path.basename(chunk_file), "frames": chunk["frames"], "written": chunk["written"],
+                    "sha256": getFileHash(chunk_file) if os.path.exists(chunk_file) else None}
+                   for chunk, chunk_file in zip(ranges, chunk_files)],
+    }
+    temp_name = manifest_name+str(os.getpid())
+    with open(temp_name, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1)
+    os.replace(temp_name, manifest_name)
+    return manifest
+
+def getStaticReport(job, start, end):
+    """ Log lines of the static objects written once: samples and bytes saved.
+    Bytes saved is an upper limit, alembic already shares identical samples
+    """
+    classes = job["classes"]
+    lines = ["Static: "+str(classes["static"])+" Transform only: "+str(classes["transform"])+" Deforming: "+str(classes["deforming"])]
+    frames = end-start+1
+    if not classes["static"] or frames < 2:
+        return lines
+    if job["static_command"]:
+        single_sample_file = job["static_version_name"]
+        lines.append("Static objects  : "+job["static_save_name"])
+    else:
+        single_sample_file = job["version_name"] # nothing moves
+    samples_saved = classes["static"]*(frames-1)
+    try:
+        bytes_saved = os.path.getsize(single_sample_file)*(frames-1)
+    except OSError:
+        bytes_saved = 0
+    lines.append("Written once    : "+str(classes["static"])+" roots. Samples saved: "+str(samples_saved)+" Bytes saved: up to "+str(bytes_saved))
+    return lines
+
+def exportSets(sets_to_export, exportsSubdirectory, notes="", namespaces_only=True, export_only_visible=True, batch_export=True, problems=None, collapse_roots=False, force=False, evaluation_mode=None,
+               static_once=False, static_samples=0, scratch_directory=None, dedupe=True, profile=None):
+    """ Exports SETs to alembic, with back-up and log for each of them.
+    Same path for the dialog and for batch jobs.
+    Returns the list of sets NOT saved.
+    "problems" (dict) is filled with the pre-flight errors of the rejected sets
+    Sets with the same fingerprint as their last export are NOT exported again,
+    unless "force"
+    "evaluation_mode" for the bake: "parallel", "serial", "off" or None (keep the scene one)
+    "static_once": objects that never move are written once in <name>_static.abc
+    ("static_samples" frames to check the ones that look animated, 0 = no check)
+    "scratch_directory": AbcExport writes to this local folder, the files go to
+    the share in background (getPublisher(scratch_directory), it also publishes
+    and writes the log). Sets queued there count as saved, see its status()
+    "dedupe": versions go to the content addressed store of the exports folder
+    (storeFile), identical versions share their disk space
+    "profile": name of the export profile (getExportProfiles), default "final".
+    Profiles with a "subdirectory" export to that folder of exportsSubdirectory
+    """
+    user = getpass.getuser()
+    host = socket.gethostname()
+    currentWorkspace = cmds.workspace(q=True, fn=True)
+    scene_path = cmds.file(q=True, sceneName=True)
+    currentMayaFile = scene_path.split('/')[-1]
+    notes = cleanNotes(notes)
+    sets_not_saved_to_alembic=[]
+    catalog_entries = [] # saved sets, written to the catalog at the end
+    timer = StageTimer() # stages shared by all the sets
+    profile = getExportProfile(profile)
+    exportsSubdirectory = getProfileDirectory(exportsSubdirectory, profile)
+
+    print("GW Alembic Saver ----------------------------------------------------------------\n")
+
+    # ALEMBIC relevant data for Maya command
+    start, end = getFrameRange()
+    frames_per_second =  cmds.currentUnit(query=True, time=True)
+    print("start fame: ", start, " End frame: " , end , "fps: " , frames_per_second)
+    print( "\n");
+    print("Export profile: "+getProfileReport(profile))
+
+    jobs = buildExportJobs(sets_to_export, exportsSubdirectory, start, end, namespaces_only, export_only_visible, collapse_roots, force,
+                           static_once, static_samples, timer, profile)
+    valid_jobs = [job for job in jobs if not job["errors"] and not job["reused"]]
+    export_id = getExportId()
+    publisher = None
+    if scratch_directory and valid_jobs:
+        publisher = getPublisher(scratch_directory)
+        for job in valid_jobs:
+            moveJobToScratch(job, scratch_directory+"/"+export_id)
+
+    # PAUSE VIEWPORT, undo, auto key... restored after the export
+    frames = getProfileFrames(start, end, profile)
+    if not batch_export:
+        frames = frames*len(valid_jobs) # one playback per set
+    with timer.stage("bake"), FastBake(frames if valid_jobs else 0, evaluation_mode) as bake:
+        with timer.stage("abc_export"), exportHooks(valid_jobs):
+            if batch_export:
+                results = exportAlembicJobsBatched(valid_jobs)
+            else:
+                results = exportAlembicJobs(valid_jobs)
+    if valid_jobs:
+        print("Baked "+str(bake.frames)+" frames in "+"%.1f" % bake.seconds+" s ("+"%.1f" % bake.framesPerSecond()+" frames/s)")
+
+    context = {"export_id": export_id, "user": user, "host": host, "maya": cmds.about(installedVersion=True),
+               "scene": scene_path, "project": currentWorkspace, "mode": "batched" if batch_export else "per set",
+               "evaluation": evaluation_mode or "scene", "start": start, "end": end, "frames": getProfileFrames(start, end, profile),
+               "fps": frames_per_second, "notes": notes, "profile": profile["name"]}
+    pass_stats = {"sets": len(valid_jobs), "stages": timer.stages,
+                  "bytes": sum(getOutputBytes(job) for job in valid_jobs if results.get(job["set"]))}
+
+    for job in jobs:
+        job_timer = StageTimer(job["stages"])
+        currentSet = job["set"]
+        file_name = job["file_name"]
+        save_name = job["save_name"]
+        command = job["command"]
+        directory_of_alembics = job["directory"]
+        version_name = job.get("share_version_name") or job["version_name"]
+        alembic_saved = results.get(currentSet, False) or job["reused"]
+        async_publish = publisher is not None and results.get(currentSet, False) and "share_version_name" in job
+        publish = None
+        store_lines = []
+        retired = []
+        digests = {}
+        if dedupe and alembic_saved and not async_publish and not job["reused"]:
+            with job_timer.stage("store"):
+                store_lines, digests = storeJobFiles([name for name in [version_name, job["static_version_name"]] if name],
+                                                     getStoreDirectory(exportsSubdirectory))
+        if alembic_saved and not async_publish:
+            with job_timer.stage("publish"):
+                try:
+                    if job["reused"] and os.path.exists(save_name) and os.path.samefile(version_name, save_name):
+                        publish = {"method": "unchanged", "bytes_copied": 0, "bytes_saved": os.path.getsize(version_name), "seconds": 0.0}
+                    else:
+                        publish = publishAlembic(version_name, save_name)
+                    static_name = job["static_save_name"]
+                    if job["static_version_name"] and not (os.path.exists(static_name) and os.path.samefile(job["static_version_name"], static_name)):
+                        publishAlembic(job["static_version_name"], static_name)
+                    retired = retireLatestFiles(save_name, bool(job["static_version_name"]))
+                    if not job["reused"]:
+                        writeFingerprint(directory_of_alembics, file_name, currentSet, job["fingerprint"], job["version"], version_name,
+                                         job["static_version_name"])
+                        print ("SAVED "+str(currentSet)+" to Alembic ")
+                    print ("                            ---->"+job["version"])
+                except (OSError, IOError) as e:
+                    alembic_saved = False
+                    cmds.warning( "Failed to publish Alembic of :" +currentSet+" "+str(e) )
+        if alembic_saved and not async_publish and not job["reused"] and version_name not in digests:
+            # no store (dedupe off or failed): the catalog gets the hash anyway
+            with job_timer.stage("hash"):
+                digests[version_name] = getFileHash(version_name)
+            store_lines.append("Checksum: "+os.path.basename(version_name)+" sha256 "+digests[version_name])
+        if alembic_saved:
+            version = job["version"]
+        else:
+            sets_not_saved_to_alembic.append(currentSet)
+            version="N/A"
+            # do not leave a broken version behind
+            for output in [job["version_name"], job["static_version_name"]]:
+                if output and os.path.exists(output) and not results.get(currentSet) and not job["reused"]:
+                    os.remove(output)
+            if job["errors"] and problems is not None:
+                problems[currentSet] = job["errors"]
+
+        # write LOG info
+        lines = [
+            "Set: "+currentSet+" Version:"+version,
+            "User name: "+user+" Machine: "+host,
+            "Maya build: "+cmds.about(installedVersion=True),
+            "Starf frame: "+str(start)+" End frame: "+str(end)+" Frames per second: "+str(frames_per_second),
+            "Project located at: "+currentWorkspace,
+            "original Maya file: "+currentMayaFile,
+            "Original Full path:"+scene_path,
+            "Profile: "+getProfileReport(profile),
+        ]
+        if batch_export:
+            lines.append("Export mode: batched ("+str(len(valid_jobs))+" sets in one pass)")
+        if job["reused"]:
+            lines.append("Unchanged since last export (same fingerprint): reused "+job["version"])
+        elif not job["errors"]:
+            lines.append("Bake: "+str(bake.frames)+" frames in "+"%.1f" % bake.seconds+" s ("+"%.1f" % bake.framesPerSecond()+" frames/s) Evaluation: "+str(evaluation_mode or "scene"))
+        lines.append("Roots: "+str(job["roots_in"])+" in, "+str(job["roots_out"])+" out"+(" (collapsed)" if collapse_roots else ""))
+        if job["classes"]:
+            lines.extend(getStaticReport(job, start, end))
+        for fix in job["fixes"]:
+            lines.append("PRE-FLIGHT fixed: "+fix)
+        if job["errors"]:
+            lines.append("WARNING : REJECTED BY PRE-FLIGHT CHECK, ALEMBIC NOT EXPORTED")
+            for error in job["errors"]:
+                lines.append("PRE-FLIGHT error: "+error)
+        elif alembic_saved :
+            lines.append("Alembic Full path :"+save_name)
+            lines.append("BackUp file       :"+version_name)
+            if publish:
+                lines.append("Published as      :"+publish["method"]+" Bytes copied: "+str(publish["bytes_copied"])+" Bytes not copied: "+str(publish["bytes_saved"])+" Seconds: "+"%.3f" % publish["seconds"])
+            lines.extend(retired)
+            lines.extend(store_lines)
+        else:
+            lines.append("WARNING : FAILED TO SAVE ALEMBIC FILE")
+            lines.append("TRYED Alembic Full path is:"+version_name)
+            lines.append("ALEMBIC Maya command options:"+command)
+        tail = ["Timing (s): "+getTimingReport(job["stages"])+" | whole export: "+getTimingReport(timer.stages),
+                "\r\nNotes: "+notes]
+        if job["reused"]:
+            status = "reused"
+        elif job["errors"]:
+            status = "rejected"
+        else:
+            status = "saved" if alembic_saved else "failed"
+        if async_publish:
+            # transfer, publish, fingerprint, log and telemetry in background
+            files = [[job["version_name"], version_name]]
+            if job["static_version_name"]:
+                files.append([job["static_version_name"], job["share_static_version_name"]])
+            record = getTelemetryRecord(job, status, context, pass_stats)
+            record["publish"] = "async"
+            publisher.submit({"id": export_id+"-"+str(jobs.index(job)), "set": currentSet, "version": job["version"], "files": files,
+                              "version_name": version_name, "save_name": save_name,
+                              "static_version_name": job["share_static_version_name"], "static_save_name": job["static_save_name"],
+                              "directory": directory_of_alembics, "file_name": file_name, "fingerprint": job["fingerprint"],
+                              "store_directory": getStoreDirectory(exportsSubdirectory) if dedupe else None,
+                              "exports_directory": exportsSubdirectory,
+                              "catalog": getCatalogEntry(job, version_name, save_name, start, end, frames_per_second, scene_path, user, host, notes),
+                              "scratch_folder": os.path.dirname(job["version_name"]), "lines": lines, "tail": tail, "record": record})
+            print ("QUEUED "+str(currentSet)+" for publish ---->"+job["version"])
+            continue
+        with job_timer.stage("log"):
+            writeExportLog(directory_of_alembics, file_name, lines+tail)
+        writeTelemetry(directory_of_alembics, file_name, getTelemetryRecord(job, status, context, pass_stats))
+        if status == "saved":
+            catalog_entries.append(getCatalogEntry(job, version_name, save_name, start, end, frames_per_second, scene_path,
+                                                   user, host, notes, digests.get(version_name)))
+
+    # one transaction for all the sets
+    if catalog_entries:
+        recordCatalog(exportsSubdirectory, catalog_entries)
+
+    if len(sets_not_saved_to_alembic) > 0:
+        print("GW Alembic Saver ----------------------------------------------------------------\n")
+        for s in sets_not_saved_to_alembic:
+            print ('WARNING: "'+str(s)+'" not saved in alembic!\n')
+    return sets_not_saved_to_alembic
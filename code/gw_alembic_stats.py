@@ -0,0 +1,136 @@
+'''
+GW Alembic saver - TELEMETRY SUMMARY
+Reads the <name>.jsonl records written next to the .log of every set and sums
+up the throughput. Runs with plain python, no Maya needed.
+
+    python gw_alembic_stats.py /proj/exports/abc
+    python gw_alembic_stats.py /proj/exports/abc /other/exports --by user --since 2026-10-01
+'''
+
+import argparse
+import json
+import os
+
+################################################################################
+def findTelemetryFiles(paths):
+    """ .jsonl files of the paths: files as they are, folders searched down
+    """
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for folder, folders, names in os.walk(path):
+            files.extend(os.path.join(folder, name) for name in sorted(names) if name.endswith(".jsonl"))
+    return files
+
+def readTelemetry(files, since=None):
+    """ All the records of the files (exported on "since" YYYY-MM-DD or later).
+    Returns records, number of broken lines (export killed while writing)
+    """
+    records = []
+    broken = 0
+    for name in files:
+        with open(name) as telemetry_file:
+            for line in telemetry_file:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    broken += 1
+                    continue
+                if since and record.get("time", "") < since:
+                    continue
+                records.append(record)
+    return records, broken
+
+def getExportShare(record):
+    """ Seconds of the AbcExport pass that belong to this set: one pass writes
+    many sets, split by bytes (or evenly if nothing was written)
+    """
+    if record.get("pass_bytes"):
+        return record.get("pass_seconds", 0.0)*record.get("bytes", 0)/record["pass_bytes"]
+    return record.get("pass_seconds", 0.0)/max(1, record.get("pass_sets", 1))
+
+def getGroupKey(record, by):
+    if by == "day":
+        return record.get("time", "")[:10]
+    return str(record.get(by))
+
+def summarizeTelemetry(records, by="set"):
+    """ One row per group ("set", "user", "host", "mode", "scene", "day"...):
+    exports, saved, reused, rejected, failed, frames, bytes, seconds (share of
+    AbcExport), mb_per_s, frames_per_s and "stages" (mean wall seconds of the saved ones)
+    """
+    groups = {}
+    for record in records:
+        key = getGroupKey(record, by)
+        row = groups.setdefault(key, {by: key, "exports": 0, "saved": 0, "reused": 0, "rejected": 0, "failed": 0,
+                                      "frames": 0, "bytes": 0, "seconds": 0.0, "stages": {}})
+        row["exports"] += 1
+        status = record.get("status", "failed")
+        row[status] = row.get(status, 0)+1
+        if status != "saved":
+            continue
+        row["frames"] += record.get("frames", 0)
+        row["bytes"] += record.get("bytes", 0)
+        row["seconds"] += getExportShare(record)
+        for name, stage in record.get("stages", {}).items():
+            row["stages"][name] = row["stages"].get(name, 0.0)+stage["wall"]
+    rows = []
+    for key in sorted(groups):
+        row = groups[key]
+        row["mb_per_s"] = row["bytes"]/(1024.0*1024.0)/row["seconds"] if row["seconds"] else 0.0
+        row["frames_per_s"] = row["frames"]/row["seconds"] if row["seconds"] else 0.0
+        for name in row["stages"]:
+            row["stages"][name] = row["stages"][name]/row["saved"]
+        rows.append(row)
+    return rows
+
+def summarizePasses(records):
+    """ Totals per AbcExport pass (records with the same "export_id" share it):
+    passes, sets, bytes, seconds, mb_per_s
+    """
+    passes = {}
+    for record in records:
+        passes.setdefault(record.get("export_id"), record)
+    seconds = sum(record.get("pass_seconds", 0.0) for record in passes.values())
+    size = sum(record.get("pass_bytes", 0) for record in passes.values())
+    return {"passes": len(passes), "sets": len(records), "bytes": size, "seconds": seconds,
+            "mb_per_s": size/(1024.0*1024.0)/seconds if seconds else 0.0}
+
+def printSummary(rows, totals, by="set"):
+    print("%-40s %6s %6s %6s %6s %6s %10s %9s %8s %8s" % (by, "total", "saved", "reused", "reject", "failed", "MB", "seconds", "MB/s", "frames/s"))
+    for row in rows:
+        print("%-40s %6d %6d %6d %6d %6d %10.1f %9.1f %8.1f %8.1f" % (
+            row[by][-40:], row["exports"], row["saved"], row["reused"], row["rejected"], row["failed"],
+            row["bytes"]/(1024.0*1024.0), row["seconds"], row["mb_per_s"], row["frames_per_s"]))
+        if row["stages"]:
+            slowest = sorted(row["stages"].items(), key=lambda stage: -stage[1])[:4]
+            print("    mean per set (s): "+", ".join(name+" %.3f" % seconds for name, seconds in slowest))
+    print("")
+    print("Passes: "+str(totals["passes"])+" Sets: "+str(totals["sets"])+" MB: %.1f" % (totals["bytes"]/(1024.0*1024.0))
+          +" AbcExport seconds: %.1f" % totals["seconds"]+" MB/s: %.1f" % totals["mb_per_s"])
+
+################################################################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GW Alembic saver telemetry summary")
+    parser.add_argument("paths", nargs="+", help="Export folders or .jsonl files")
+    parser.add_argument("--by", default="set", help="Group by: set, user, host, mode, scene, evaluation, profile, day")
+    parser.add_argument("--since", default=None, help="Only exports on this day (YYYY-MM-DD) or later")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+    records, broken = readTelemetry(findTelemetryFiles(args.paths), args.since)
+    rows = summarizeTelemetry(records, args.by)
+    totals = summarizePasses(records)
+    if args.json:
+        print(json.dumps({"rows": rows, "totals": totals, "broken_lines": broken}, indent=1))
+    else:
+        printSummary(rows, totals, args.by)
+        if broken:
+            print("Broken lines skipped: "+str(broken))
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+'''
+GW Alembic saver - VERSION STORE
+Retention and garbage collection of the versions in an exports folder.
+Every <name>_vNNN.abc is a hardlink of an object of <exports>/.gw_store
+(see gw_alembic_core.storeFile), an object nobody links any more is garbage.
+Runs with plain python, no Maya needed.
+
+    python gw_alembic_store.py ingest /proj/exports/abc
+    python gw_alembic_store.py tag /proj/exports/abc/charA v012 approved
+    python gw_alembic_store.py prune /proj/exports/abc --keep-last 5 --keep-days 30 --dry-run
+    python gw_alembic_store.py gc /proj/exports/abc
+    python gw_alembic_store.py report /proj/exports/abc
+'''
+
+import argparse
+import json
+import os
+import time
+
+import gw_alembic_catalog as catalog
+import gw_alembic_core as core
+
+tags_name = ".gw_tags" # {version: [tags]} in every folder of versions
+
+################################################################################
+def isExportsRoot(folder):
+    # the folder of an export profile ("preview") has its own store and catalog
+    return os.path.exists(os.path.join(folder, core.store_directory_name)) or os.path.exists(os.path.join(folder, core.catalog_name))
+
+def findVersionFolders(exports_root):
+    """ Folders of versions under the exports root (one per set): the ones with
+    files named after the folder (<folder>_vNNN.abc). The root itself never is
+    one (its latest files can look like versions: "rockC_v002.abc" of "rockC_v002:geo_set").
+    Other exports roots inside it (export profiles) are left out, run the tools on them
+    """
+    folders = []
+    for folder, subfolders, names in os.walk(exports_root):
+        subfolders[:] = sorted(name for name in subfolders
+                               if name != core.store_directory_name and not isExportsRoot(os.path.join(folder, name)))
+        if os.path.normpath(folder) == os.path.normpath(exports_root):
+            continue
+        file_name = os.path.basename(folder)
+        if core.version_index_name in names or any(core.getVersionNumber(name, file_name) is not None for name in names):
+            folders.append(folder)
+    return folders
+
+def getVersionFiles(folder):
+    """ {"vNNN": [files]}: the version, its static file, chunks and manifest.
+    Only the files named after the folder, temp files of a running export,
+    logs, index... are left alone
+    """
+    versions = {}
+    file_name = os.path.basename(folder)
+    for name in sorted(os.listdir(folder)):
+        number = core.getVersionNumber(name, file_name)
+        if number is not None:
+            versions.setdefault("v"+str(number).zfill(3), []).append(os.path.join(folder, name))
+    return versions
+
+def readTags(folder):
+    try:
+        with open(os.path.join(folder, tags_name)) as tags_file:
+            return json.load(tags_file)
+    except (IOError, OSError, ValueError):
+        return {}
+
+def writeTags(folder, tags):
+    temp_name = os.path.join(folder, tags_name+str(os.getpid()))
+    with open(temp_name, "w") as tags_file:
+        json.dump(tags, tags_file, indent=1)
+    os.replace(temp_name, os.path.join(folder, tags_name))
+
+def tagVersion(folder, version, tag):
+    """ Tagged versions are never pruned
+    """
+    tags = readTags(folder)
+    if tag not in tags.setdefault(version, []):
+        tags[version].append(tag)
+    writeTags(folder, tags)
+    return tags
+
+def untagVersion(folder, version, tag=None):
+    # tag None: all the tags of the version
+    tags = readTags(folder)
+    if version in tags:
+        tags[version] = [name for name in tags[version] if tag is not None and name != tag]
+        if not tags[version]:
+            del tags[version]
+    writeTags(folder, tags)
+    return tags
+
+def getPublishedVersions(folder):
+    """ {latest file name: version} of the last export the log says was
+    published as each latest file of the folder
+    """
+    file_name = os.path.basename(folder)
+    log_name = os.path.join(folder, file_name+".log")
+    published = {}
+    if not os.path.exists(log_name):
+        return published
+    for entry in catalog.parseExportLog(log_name):
+        if not entry["set"] or entry["version"] in (None, "N/A"):
+            continue
+        if entry["manifest"]:
+            published[file_name+".manifest.json"] = entry["version"]
+        elif entry["backup"]:
+            published[file_name+".abc"] = entry["version"]
+            published[file_name+"_static.abc"] = entry["version"]
+    return published
+
+def getExportTimes(folder):
+    """ {version: time of its last export in the log (seconds)}. Not the dates of
+    the files: after dedupe, a new version with known content is a link of an
+    old object and has its date
+    """
+    file_name = os.path.basename(folder)
+    log_name = os.path.join(folder, file_name+".log")
+    times = {}
+    if not os.path.exists(log_name):
+        return times
+    for entry in catalog.parseExportLog(log_name):
+        if not entry["set"] or entry["version"] in (None, "N/A"):
+            continue
+        try:
+            exported = time.mktime(time.strptime(entry["time"], "%Y-%m-%d %H:%M"))
+        except ValueError:
+            continue
+        times[entry["version"]] = max(exported, times.get(entry["version"], 0))
+    return times
+
+def getProtectedVersions(folder):
+    """ Versions in use: published as the latest file, or remembered by the
+    fingerprint (reused by the next export if nothing changed).
+    By version NAME: after dedupe, older versions with the same content share
+    the inode of the latest file. Without a log, the newest of those is kept
+    """
+    protected = set()
+    file_name = os.path.basename(folder)
+    exports_root = os.path.dirname(folder)
+    versions = getVersionFiles(folder)
+    published = getPublishedVersions(folder)
+    for latest in [file_name+".abc", file_name+"_static.abc", file_name+".manifest.json"]:
+        latest_name = os.path.join(exports_root, latest)
+        if not os.path.exists(latest_name):
+            continue
+        if latest in published:
+            protected.add(published[latest])
+            continue
+        same = [version for version in versions if any(os.path.samefile(latest_name, name) for name in versions[version])]
+        if same:
+            protected.add(max(same, key=lambda version: int(version[1:])))
+    for entry in core.readFingerprints(folder, file_name).values():
+        number = core.getVersionNumber(os.path.basename(entry.get("version_name") or ""), file_name)
+        if number is not None:
+            protected.add("v"+str(number).zfill(3))
+    return protected
+
+def planRetention(folder, keep_last=5, keep_days=None, now=None):
+    """ Which versions of the folder to keep and why: the last "keep_last",
+    the tagged ones, the ones younger than "keep_days" days (None: no age rule,
+    the age is from the log, the file dates when the log does not have the version)
+    and the ones in use. Returns {version: reasons}, [versions to delete]
+    """
+    now = now or time.time()
+    versions = getVersionFiles(folder)
+    tags = readTags(folder)
+    protected = getProtectedVersions(folder)
+    exported = getExportTimes(folder) if keep_days is not None else {}
+    ordered = sorted(versions, key=lambda version: int(version[1:]))
+    keep = {}
+    for version in ordered[-keep_last:] if keep_last > 0 else []:
+        keep.setdefault(version, []).append("last "+str(keep_last))
+    for version in ordered:
+        if tags.get(version):
+            keep.setdefault(version, []).append("tagged "+", ".join(tags[version]))
+        if version in protected:
+            keep.setdefault(version, []).append("in use")
+        if keep_days is not None and now-exported.get(version, max(os.path.getmtime(name) for name in versions[version])) < keep_days*86400:
+            keep.setdefault(version, []).append("younger than "+str(keep_days)+" days")
+    return keep, [version for version in ordered if version not in keep]
+
+def pruneVersions(exports_root, keep_last=5, keep_days=None, dry_run=False):
+    """ Deletes the versions the retention policy does not keep, in every folder.
+    Returns {"versions", "files", "folders", "bytes_freed" (space back at once,
+    files with no other link), "bytes_to_collect" (objects of the store left
+    with no version, freed by collectGarbage)}
+    """
+    report = {"versions": 0, "files": 0, "bytes_freed": 0, "bytes_to_collect": 0, "folders": 0}
+    removed = {} # inode --> [links removed, links, size]
+    for folder in findVersionFolders(exports_root):
+        keep, delete = planRetention(folder, keep_last, keep_days)
+        if not delete:
+            continue
+        report["folders"] += 1
+        versions = getVersionFiles(folder)
+        for version in delete:
+            report["versions"] += 1
+            for name in versions[version]:
+                stat = os.stat(name)
+                report["files"] += 1
+                removed.setdefault((stat.st_dev, stat.st_ino), [0, stat.st_nlink, stat.st_size])[0] += 1
+                if not dry_run:
+                    os.remove(name)
+            if not dry_run:
+                core.removeFromCatalog(os.path.dirname(folder), versions[version])
+        print(("WOULD PRUNE " if dry_run else "PRUNED ")+folder+": "+", ".join(delete))
+        if not dry_run:
+            core.writeExportLog(folder, os.path.basename(folder), [
+                "PRUNED versions: "+", ".join(delete),
+                "Retention: keep last "+str(keep_last)+(", keep "+str(keep_days)+" days" if keep_days is not None else "")+", keep tagged, keep in use",
+                "Kept: "+", ".join(version+" ("+"; ".join(keep[version])+")" for version in sorted(keep, key=lambda v: int(v[1:]))),
+            ])
+    stored = getStoredInodes(exports_root)
+    for inode, (links_removed, links, size) in removed.items():
+        if links_removed == links:
+            report["bytes_freed"] += size
+        elif links_removed == links-1 and inode in stored:
+            report["bytes_to_collect"] += size
+    return report
+
+def getStoredInodes(exports_root):
+    inodes = set()
+    objects_directory = core.getStoreDirectory(exports_root)+"/objects"
+    if os.path.isdir(objects_directory):
+        for folder in os.listdir(objects_directory):
+            for name in os.listdir(os.path.join(objects_directory, folder)):
+                stat = os.stat(os.path.join(objects_directory, folder, name))
+                inodes.add((stat.st_dev, stat.st_ino))
+    return inodes
+
+def collectGarbage(exports_root, dry_run=False):
+    """ Deletes the stored objects no version links any more.
+    Returns {"objects", "bytes_freed"}
+    """
+    report = {"objects": 0, "bytes_freed": 0}
+    objects_directory = core.getStoreDirectory(exports_root)+"/objects"
+    if not os.path.isdir(objects_directory):
+        return report
+    for folder in sorted(os.listdir(objects_directory)):
+        folder = os.path.join(objects_directory, folder)
+        for name in os.listdir(folder):
+            object_name = os.path.join(folder, name)
+            stat = os.stat(object_name)
+            if stat.st_nlink > 1:
+                continue
+            report["objects"] += 1
+            report["bytes_freed"] += stat.st_size
+            if not dry_run:
+                os.remove(object_name)
+        if not dry_run and not os.listdir(folder):
+            os.rmdir(folder)
+    return report
+
+def ingestTree(exports_root, dry_run=False):
+    """ Puts the versions already on disk in the store (old exports, or made
+    without it). Returns {"files", "bytes_saved"}
+    """
+    report = {"files": 0, "bytes_saved": 0}
+    store_directory = core.getStoreDirectory(exports_root)
+    seen = {} # sha256 --> file, for dry runs
+    for folder in findVersionFolders(exports_root):
+        for version, names in sorted(getVersionFiles(folder).items()):
+            for name in names:
+                if not name.endswith(".abc"):
+                    continue
+                report["files"] += 1
+                if dry_run:
+                    digest = core.getFileHash(name)
+                    object_name = core.getObjectName(store_directory, digest)
+                    if digest in seen or os.path.exists(object_name) and not os.path.samefile(object_name, name):
+                        report["bytes_saved"] += os.path.getsize(name)
+                    seen.setdefault(digest, name)
+                    continue
+                digest, saved = core.storeFile(name, store_directory)
+                report["bytes_saved"] += saved
+    return report
+
+def getStoreReport(exports_root):
+    """ "versions" (files), "logical_bytes" (their sizes added), "objects",
+    "stored_bytes" (the space they really take) and "ratio"
+    """
+    report = {"versions": 0, "logical_bytes": 0, "objects": 0, "stored_bytes": 0, "ratio": 1.0}
+    inodes = set()
+    for folder in findVersionFolders(exports_root):
+        for names in getVersionFiles(folder).values():
+            for name in names:
+                stat = os.stat(name)
+                report["versions"] += 1
+                report["logical_bytes"] += stat.st_size
+                if (stat.st_dev, stat.st_ino) not in inodes:
+                    inodes.add((stat.st_dev, stat.st_ino))
+                    report["objects"] += 1
+                    report["stored_bytes"] += stat.st_size
+    if report["stored_bytes"]:
+        report["ratio"] = float(report["logical_bytes"])/report["stored_bytes"]
+    return report
+
+def formatBytes(size):
+    return "%.1f MB" % (size/(1024.0*1024.0))
+
+################################################################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GW Alembic saver version store")
+    commands = parser.add_subparsers(dest="command")
+    ingest = commands.add_parser("ingest", help="Put the versions already on disk in the store")
+    ingest.add_argument("exports")
+    ingest.add_argument("--dry-run", action="store_true")
+    tag = commands.add_parser("tag", help="Tag a version, tagged versions are never pruned")
+    tag.add_argument("folder", help="Folder of the versions of one set")
+    tag.add_argument("version", help="vNNN")
+    tag.add_argument("tag")
+    untag = commands.add_parser("untag", help="Remove a tag (all of them if none given)")
+    untag.add_argument("folder")
+    untag.add_argument("version")
+    untag.add_argument("tag", nargs="?", default=None)
+    prune = commands.add_parser("prune", help="Apply the retention policy, then collect the garbage")
+    prune.add_argument("exports")
+    prune.add_argument("--keep-last", type=int, default=5, help="Versions kept in every folder")
+    prune.add_argument("--keep-days", type=float, default=None, help="Also keep versions exported less than this many days ago")
+    prune.add_argument("--dry-run", action="store_true")
+    gc = commands.add_parser("gc", help="Delete the stored objects no version uses")
+    gc.add_argument("exports")
+    gc.add_argument("--dry-run", action="store_true")
+    report = commands.add_parser("report", help="Space used against space saved")
+    report.add_argument("exports")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        result = ingestTree(args.exports, args.dry_run)
+        print("Versions: "+str(result["files"])+" Space reclaimed: "+formatBytes(result["bytes_saved"]))
+    elif args.command == "tag":
+        print(json.dumps(tagVersion(args.folder, args.version, args.tag), indent=1))
+    elif args.command == "untag":
+        print(json.dumps(untagVersion(args.folder, args.version, args.tag), indent=1))
+    elif args.command == "prune":
+        pruned = pruneVersions(args.exports, args.keep_last, args.keep_days, args.dry_run)
+        collected = collectGarbage(args.exports, args.dry_run)
+        reclaimed = pruned["bytes_freed"]+collected["bytes_freed"]
+        if args.dry_run:
+            # the pruned versions still link their objects, gc only saw the ones unused today
+            reclaimed += pruned["bytes_to_collect"]
+        print("Versions pruned: "+str(pruned["versions"])+" in "+str(pruned["folders"])+" folders, "+str(collected["objects"])+" objects collected")
+        print("Space reclaimed: "+formatBytes(reclaimed)+(" (dry run)" if args.dry_run else ""))
+    elif args.command == "gc":
+        collected = collectGarbage(args.exports, args.dry_run)
+        print("Objects collected: "+str(collected["objects"])+" Space reclaimed: "+formatBytes(collected["bytes_freed"]))
+    elif args.command == "report":
+        result = getStoreReport(args.exports)
+        print("Version files: "+str(result["versions"])+" Size: "+formatBytes(result["logical_bytes"]))
+        print("Distinct contents: "+str(result["objects"])+" On disk: "+formatBytes(result["stored_bytes"])+" Ratio: %.2fx" % result["ratio"])
+    else:
+        parser.print_help()
+    return 0
+
+if __name__ == "__main__":
+    main()
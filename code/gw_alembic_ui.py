@@ -0,0 +1,421 @@
+'''
+GW Alembic saver - DIALOG
+Qt window for the exporter. All the work is done by gw_alembic_core.py
+
+Run from the shelf with bake_geo_python3.py, or:
+    import gw_alembic_ui
+    gw_alembic_ui.launch()
+'''
+
+import fnmatch
+import os
+import maya.cmds as cmds
+from PySide2 import QtCore
+from PySide2.QtWidgets import QAbstractItemView
+from PySide2 import QtWidgets
+from maya import OpenMayaUI as omui
+from shiboken2 import wrapInstance
+import gw_alembic_core as core
+import gw_alembic_batch
+
+transfer_window = None # the transfers window lives after the dialog is closed
+
+def getMayaMainWindow():
+    mayaMainWindowPtr = omui.MQtUtil.mainWindow()
+    return wrapInstance(int(mayaMainWindowPtr), QtWidgets.QWidget)
+
+class GW_alembic_saver(QtWidgets.QWidget):
+    '''
+    '''
+    def __init__(self, parent=None):
+        QtWidgets.QWidget.__init__(self, parent)
+        mayaMainWindow =  getMayaMainWindow()
+        # check for exiting window to avoid duplicates
+        objectName = "GwAlembicWindow"
+        if cmds.window("GwAlembicWindow", exists = True):
+            cmds.deleteUI("GwAlembicWindow", wnd=True)
+        self.setObjectName(objectName)
+        #Parent widget under Maya main window
+        self.setParent(mayaMainWindow)
+        self.setWindowFlags(QtCore.Qt.Window)
+
+        #create MAIN layout ####################################################
+        self.main_Layout = QtWidgets.QVBoxLayout(self)
+        self.setGeometry(1200, 800, 400, 340)
+        self.move(600, 350)
+        self.setWindowTitle(core.software_version)
+
+        # Accessing pre existing variables from within Maya
+        self.currentWorkspace = cmds.workspace(q=True, fn=True)
+        self.currentMayaFile = cmds.file(q=True, sceneName=True).split('/')[-1]
+        self.exportsSubdirectory = core.getDefaultExportsDirectory()
+
+        self.gwTitle = QtWidgets.QLabel(" GW Export Sets to Alembic")
+        self.gwTitle.setStyleSheet("color: white;background-color:  rgb(37,42,57);")
+        self.gwTitle.setFixedHeight(30)
+        
+        self.gwTitle2 = QtWidgets.QLabel(""" Exports selected character SETs to Alemibic
+ Models must have the geometry in SETs
+ 
+ IMPORTANT!
+ - Alembic file name will be the NAMESPACE of the character.
+ - It will be writen in the "exports/abc" folder unless 
+   otherwise specified.
+ - Also will output to CURRENT PROJECT.
+ - Hidden geometry will NOT be exported by default.
+ - Log file and back-Up will also be writen.
+
+ HOW TO USE: 
+
+   1) Select SETS to export 
+   2) Add "notes" (optional)
+   3) Push button "Save Alembic" to write to disk
+
+ If you want to use other folder, check "Advanced Options"
+ and use "Folder" button to select one.
+""")
+        self.gwTitle2.setStyleSheet("color: white;background-color:  rgb(57,42,37);")
+        #self.gwTitle.setFixedHeight(30)
+
+        self.setsNameLabel = QtWidgets.QLabel("Select sets to export:", self)
+        self.setsFilter = QtWidgets.QLineEdit(self)
+        self.setsFilter.setPlaceholderText("Filter sets (name or *pattern*)")
+        self.setsFilter.textChanged.connect(self.filter_sets)
+        self.setsList = QtWidgets.QListWidget(self)
+        self.setsList.setFixedHeight(180) # SIZE
+        self.setsList.setSelectionMode(QAbstractItemView.MultiSelection)
+        self.setsList.itemSelectionChanged.connect(self.on_change_list)
+
+        # NOTES FOR ALEMBIC FILE ##########################################
+        self.notesLabel = QtWidgets.QLabel("Notes:", self)
+        self.notes = QtWidgets.QTextEdit("", self)
+        self.notes.setPlainText("")
+        self.notes.setFixedHeight(40) # SIZE
+
+        text = self.notes.toPlainText() # returns plain text
+
+        # EXPORT PROFILE: "preview" and "blocking" skip the expensive data, in their own folder
+        self.profileLabel = QtWidgets.QLabel("Export profile:", self)
+        self.profile = QtWidgets.QComboBox(self)
+        profiles = core.getExportProfiles()
+        for name in [core.default_profile]+sorted(name for name in profiles if name != core.default_profile):
+            self.profile.addItem(name)
+            self.profile.setItemData(self.profile.count()-1, core.getProfileReport(profiles[name]), QtCore.Qt.ToolTipRole)
+
+        self.toggleAdvancedOptions = QtWidgets.QCheckBox("Advanced Options")
+        self.toggleAdvancedOptions.setChecked(False)
+        self.toggleAdvancedOptions.stateChanged.connect(self.toggle_advanced_options)
+
+        self.toggleOnlyVisible = QtWidgets.QCheckBox("Export only visible objects")
+        self.toggleOnlyVisible.setChecked(True)
+        self.toggleOnlyVisible.setEnabled(False)
+
+        self.toggleNamespacesOnly = QtWidgets.QCheckBox("Use Namespace only")
+        self.toggleNamespacesOnly.setChecked(True)
+        self.toggleNamespacesOnly.setEnabled(False)
+
+        self.toggleBatchExport = QtWidgets.QCheckBox("Export all sets in one pass")
+        self.toggleBatchExport.setChecked(True)
+        self.toggleBatchExport.setEnabled(False)
+
+        self.toggleCollapseRoots = QtWidgets.QCheckBox("Collapse roots to common parents (parents are written too)")
+        self.toggleCollapseRoots.setChecked(False)
+        self.toggleCollapseRoots.setEnabled(False)
+
+        self.toggleForceExport = QtWidgets.QCheckBox("Force export of unchanged sets")
+        self.toggleForceExport.setChecked(False)
+        self.toggleForceExport.setEnabled(False)
+
+        self.toggleStaticOnce = QtWidgets.QCheckBox("Write static objects once (extra _static.abc)")
+        self.toggleStaticOnce.setChecked(False)
+        self.toggleStaticOnce.setEnabled(False)
+
+        self.evaluationModeLabel = QtWidgets.QLabel("Evaluation for export:", self)
+        self.evaluationMode = QtWidgets.QComboBox(self)
+        self.evaluationMode.addItems(["Scene setting", "parallel", "serial", "off"])
+        self.evaluationMode.setEnabled(False)
+
+        self.toggleAsyncPublish = QtWidgets.QCheckBox("Write to local scratch, copy to the share in background")
+        self.toggleAsyncPublish.setChecked(False)
+        self.toggleAsyncPublish.setEnabled(False)
+
+        self.chunksLabel = QtWidgets.QLabel("Parallel chunks (1 = off, the SAVED scene is exported):", self)
+        self.chunks = QtWidgets.QSpinBox(self)
+        self.chunks.setRange(1, 32)
+        self.chunks.setEnabled(False)
+        self.handlesLabel = QtWidgets.QLabel("Chunk handles (frames):", self)
+        self.handles = QtWidgets.QSpinBox(self)
+        self.handles.setRange(0, 100)
+        self.handles.setEnabled(False)
+
+        self.BrowseAlembicFile = QtWidgets.QPushButton('Folder', self)
+        self.BrowseAlembicFile.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.BrowseAlembicFile.setEnabled(False)
+        self.connect(self.BrowseAlembicFile, QtCore.SIGNAL('clicked()'), self.browse_for_alembic)
+
+        self.alembicFileName = QtWidgets.QLabel(self.exportsSubdirectory)
+        self.alembicFileName.setStyleSheet("color: white;background-color: rgb(37,42,57);")
+        self.alembicFileName.setFixedHeight(30)
+
+        self.button = QtWidgets.QPushButton('Save Alembic', self)
+        self.button.setFocusPolicy(QtCore.Qt.NoFocus)
+        self.connect(self.button, QtCore.SIGNAL('clicked()'), self.saveAlembic)
+
+        # BUILD LAYOUTS AND WIDGETS ############################################
+        self.main_Layout.addWidget(self.gwTitle)
+        self.main_Layout.addWidget(self.gwTitle2)
+        self.main_Layout.addWidget(self.setsNameLabel)
+        self.main_Layout.addWidget(self.setsFilter)
+        self.main_Layout.addWidget(self.setsList)
+        self.main_Layout.addWidget(self.notesLabel)
+        self.main_Layout.addWidget(self.notes)
+        self.main_Layout.addWidget(self.profileLabel)
+        self.main_Layout.addWidget(self.profile)
+        self.main_Layout.addWidget(self.toggleAdvancedOptions)
+        self.main_Layout.addWidget(self.toggleOnlyVisible)
+        self.main_Layout.addWidget(self.toggleNamespacesOnly)
+        self.main_Layout.addWidget(self.toggleBatchExport)
+        self.main_Layout.addWidget(self.toggleCollapseRoots)
+        self.main_Layout.addWidget(self.toggleForceExport)
+        self.main_Layout.addWidget(self.toggleStaticOnce)
+        self.main_Layout.addWidget(self.evaluationModeLabel)
+        self.main_Layout.addWidget(self.evaluationMode)
+        self.main_Layout.addWidget(self.toggleAsyncPublish)
+        self.main_Layout.addWidget(self.chunksLabel)
+        self.main_Layout.addWidget(self.chunks)
+        self.main_Layout.addWidget(self.handlesLabel)
+        self.main_Layout.addWidget(self.handles)
+        self.main_Layout.addWidget(self.BrowseAlembicFile)
+        self.main_Layout.addWidget(self.alembicFileName)
+
+        self.main_Layout.addWidget(self.button)
+
+        # GET the user created SETS in the scene, AFTER the window is shown
+        self.user_sets = []
+        self.setsNameLabel.setText("Looking for sets...")
+        QtCore.QTimer.singleShot(0, self.find_sets)
+
+    def find_sets(self):
+        self.user_sets = core.getUserSets()
+        self.setsNameLabel.setText("Select sets to export ("+str(len(self.user_sets))+"):")
+        self.fill_sets(0)
+
+    def fill_sets(self, first):
+        # add the sets in chunks, the window stays responsive on huge scenes
+        chunk = 200
+        for name in self.user_sets[first:first+chunk]:
+            item = QtWidgets.QListWidgetItem(name)
+            self.setsList.addItem(item)
+            item.setHidden(not self.set_matches_filter(name))
+        if first+chunk < len(self.user_sets):
+            QtCore.QTimer.singleShot(0, lambda: self.fill_sets(first+chunk))
+
+    def set_matches_filter(self, name):
+        text = self.setsFilter.text().strip().lower()
+        if not text:
+            return True
+        if "*" in text or "?" in text:
+            return fnmatch.fnmatchcase(name.lower(), text)
+        return text in name.lower()
+
+    def filter_sets(self):
+        for row in range(self.setsList.count()):
+            item = self.setsList.item(row)
+            item.setHidden(not self.set_matches_filter(item.text()))
+
+    def on_change_list(self):
+        cmds.select(clear=True)
+        for item in self.setsList.selectedItems():
+            # print(item.text())
+            cmds.select(item.text(),add=True )
+
+    def browse_for_alembic(self):
+
+        directory = cmds.fileDialog2(
+            caption="Set Alembic folder",
+            startingDirectory = self.currentWorkspace,
+            fileFilter="*.abc",
+            dialogStyle=2,
+            fileMode = 3
+        )
+        if (directory != None):
+            self.exportsSubdirectory = directory[0]
+            self.alembicFileName.setText(self.exportsSubdirectory)
+        # print self.exportsSubdirectory
+        return
+
+    def toggle_advanced_options(self):
+        if self.toggleAdvancedOptions.isChecked():
+            self.toggleOnlyVisible.setEnabled(True)
+            self.toggleNamespacesOnly.setEnabled(True)
+            self.toggleBatchExport.setEnabled(True)
+            self.toggleCollapseRoots.setEnabled(True)
+            self.toggleForceExport.setEnabled(True)
+            self.toggleStaticOnce.setEnabled(True)
+            self.evaluationMode.setEnabled(True)
+            self.toggleAsyncPublish.setEnabled(True)
+            self.chunks.setEnabled(True)
+            self.handles.setEnabled(True)
+            self.BrowseAlembicFile.setEnabled(True)
+        else:
+            self.toggleOnlyVisible.setEnabled(False)
+            self.toggleNamespacesOnly.setEnabled(False)
+            self.toggleBatchExport.setEnabled(False)
+            self.toggleCollapseRoots.setEnabled(False)
+            self.toggleForceExport.setEnabled(False)
+            self.toggleStaticOnce.setEnabled(False)
+            self.evaluationMode.setEnabled(False)
+            self.toggleAsyncPublish.setEnabled(False)
+            self.chunks.setEnabled(False)
+            self.handles.setEnabled(False)
+            self.BrowseAlembicFile.setEnabled(False)
+
+    def selectSets(self):
+        # select the content of the set
+        currentSet=self.setsCombo.currentText()
+        # print ("current set :"+currentSet+"\n")
+        if (currentSet != "<Select set>"):
+            cmds.select(currentSet,replace=True )
+
+    def saveAlembic(self):
+        advanced_options = self.toggleAdvancedOptions.isChecked()
+        Namespaces_only = self.toggleNamespacesOnly.isChecked()
+        export_only_visible = self.toggleOnlyVisible.isChecked()
+        batch_export = self.toggleBatchExport.isChecked()
+        collapse_roots = self.toggleCollapseRoots.isChecked()
+        force = self.toggleForceExport.isChecked()
+        static_once = self.toggleStaticOnce.isChecked()
+        evaluation_mode = None
+        if self.evaluationMode.currentIndex() > 0:
+            evaluation_mode = self.evaluationMode.currentText()
+        chunks = self.chunks.value()
+        profile = self.profile.currentText()
+        scratch_directory = None
+        if self.toggleAsyncPublish.isChecked():
+            scratch_directory = core.getDefaultScratchDirectory()
+
+        # sets_to_export = self.setsList.selectedItems()
+        sets_to_export = []
+        for item in self.setsList.selectedItems():
+            sets_to_export.append(item.text())
+        if len(sets_to_export) == 0:
+            msgBox = QtWidgets.QMessageBox()
+            msgBox.critical(self,"Warning", "No SETS selected!\n\nPlease, select a Set to proceed")
+            return
+        notes = self.notes.toPlainText()
+
+        problems = {}
+        if chunks > 1:
+            if cmds.file(q=True, modified=True):
+                msgBox = QtWidgets.QMessageBox()
+                msgBox.critical(self,"Warning", "Scene not saved!\n\nParallel chunks export the scene on disk,\nsave it before proceed")
+                return
+            sets_not_saved_to_alembic = gw_alembic_batch.exportSetsSharded(
+                sets_to_export,
+                self.exportsSubdirectory,
+                chunks,
+                self.handles.value(),
+                notes = notes,
+                namespaces_only = Namespaces_only,
+                export_only_visible = export_only_visible,
+                collapse_roots = collapse_roots,
+                force = force,
+                evaluation_mode = evaluation_mode,
+                problems = problems,
+                profile = profile
+            )
+        else:
+            sets_not_saved_to_alembic = core.exportSets(
+                sets_to_export,
+                self.exportsSubdirectory,
+                notes = notes,
+                namespaces_only = Namespaces_only,
+                export_only_visible = export_only_visible,
+                batch_export = batch_export,
+                collapse_roots = collapse_roots,
+                force = force,
+                evaluation_mode = evaluation_mode,
+                static_once = static_once,
+                scratch_directory = scratch_directory,
+                problems = problems,
+                profile = profile
+            )
+        if len(sets_not_saved_to_alembic) > 0:
+            report = ""
+            for currentSet in problems:
+                report = report+"\n"+currentSet+":\n - "+"\n - ".join(problems[currentSet])+"\n"
+            msgBox = QtWidgets.QMessageBox()
+            msgBox.critical(self,"Alembic failure", "Not all SETS saved!\n\nCheck script editor!!\n\nCHECK if all nodes to export have different names\nAlso instances are NOT supported by Maya alembic\n"+report)
+        elif not scratch_directory:
+            msgBox = QtWidgets.QMessageBox()
+            msgBox.setWindowTitle("Info")
+            msgBox.setText("Alembic saved!")
+            msgBox.exec_()
+        if scratch_directory and chunks == 1:
+            # do not wait for the share, the transfers window follows them
+            showTransferStatus(core.getPublisher(scratch_directory))
+
+        self.close()
+
+class TransferStatus(QtWidgets.QWidget):
+    """ Background publishes (local scratch --> share), refreshed twice a second
+    """
+    def __init__(self, publisher, parent=None):
+        QtWidgets.QWidget.__init__(self, parent)
+        objectName = "GwAlembicTransfers"
+        if cmds.window(objectName, exists = True):
+            cmds.deleteUI(objectName, wnd=True)
+        self.setObjectName(objectName)
+        self.setParent(getMayaMainWindow())
+        self.setWindowFlags(QtCore.Qt.Window)
+        self.setGeometry(1200, 800, 500, 200)
+        self.publisher = publisher
+
+        self.main_Layout = QtWidgets.QVBoxLayout(self)
+        self.transfersList = QtWidgets.QListWidget(self)
+        self.main_Layout.addWidget(self.transfersList)
+
+        self.timer = QtCore.QTimer(self)
+        self.connect(self.timer, QtCore.SIGNAL('timeout()'), self.refresh)
+        self.timer.start(500)
+        self.refresh()
+
+    def refresh(self):
+        self.transfersList.clear()
+        for status in self.publisher.status():
+            text = status["set"]+" "+status["version"]+" : "+status["state"]
+            if status["state"] == "done":
+                text = text+" ("+"%.1f" % (status["bytes"]/(1024.0*1024.0))+" MB in "+"%.1f" % status["seconds"]+" s)"
+            elif status["attempts"] > 1 or status["state"] in ["failed", "lost"]:
+                text = text+" (attempt "+str(status["attempts"])+") "+str(status["error"])
+            self.transfersList.addItem(text)
+        pending = self.publisher.pending()
+        if pending:
+            self.setWindowTitle("GW Alembic transfers - "+str(pending)+" pending")
+        else:
+            self.setWindowTitle("GW Alembic transfers - all done")
+
+def showTransferStatus(publisher):
+    global transfer_window
+    transfer_window = TransferStatus(publisher)
+    transfer_window.show()
+    return transfer_window
+
+################################################################################
+def launch():
+    """ Check if Maya scene file exists, load AbcExport and show the dialog
+    """
+    maya_scene_name = cmds.file(query=True, sceneName=True, shortName=True)
+    print (maya_scene_name)
+    if (maya_scene_name==""):
+        cmds.confirmDialog( title='SCENE NOT SAVED', message='Cannot work with \"untitled\" Maya scene.\nPlease, save scene before proceed.', button=['OK'], defaultButton='Ok', dismissString='Ok' )
+        return None
+    core.loadAbcExportPlugin()
+    # publishes left behind by a crash are finished now
+    if os.path.isdir(os.path.join(core.getDefaultScratchDirectory(), core.scratch_journal_name)):
+        publisher = core.getPublisher()
+        if publisher.pending():
+            showTransferStatus(publisher)
+    dialog = GW_alembic_saver()
+    dialog.show()
+    return dialog
@@ -0,0 +1,12 @@
+'''
+Tests run with plain python, no Maya: gw_alembic_core.cmds is replaced by
+StubCmds (stub_cmds.py). Run from the repository root: python -m pytest tests
+'''
+
+import os
+import sys
+
+tests_directory = os.path.dirname(os.path.abspath(__file__))
+for directory in [tests_directory, os.path.join(os.path.dirname(tests_directory), "code")]:
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
@@ -0,0 +1,72 @@
+'''
+Stand-in for maya.cmds: the calls the exporter makes, on a scene of flat sets.
+AbcExport writes its job string in the file, jobs with a name of "fail" raise
+'''
+
+import os
+
+class StubCmds(object):
+    def __init__(self, sets, start=1, end=10, fail=()):
+        self.sets = sets # {set: [members]}
+        self.start = start
+        self.end = end
+        self.fail = list(fail)
+        self.calls = [] # AbcExport job lists
+        self.selection = []
+        self.paused = False
+        self.time = start
+
+    def workspace(self, **kwargs):
+        return "/proj"
+    def file(self, *args, **kwargs):
+        if kwargs.get("modified"):
+            return False
+        if kwargs.get("reference"):
+            return []
+        return "/proj/scenes/shot.ma"
+    def playbackOptions(self, **kwargs):
+        return self.start if kwargs.get("animationStartTime") else self.end
+    def currentUnit(self, **kwargs):
+        return "film"
+    def currentTime(self, *args, **kwargs):
+        if kwargs.get("query") or kwargs.get("q"):
+            return self.time
+        self.time = args[0]
+    def about(self, **kwargs):
+        return "Maya stub"
+    def warning(self, message):
+        pass
+    def pluginInfo(self, *args, **kwargs):
+        return True
+    def ogs(self, **kwargs):
+        if kwargs.get("query"):
+            return self.paused
+        self.paused = not self.paused
+    def getAttr(self, attribute):
+        return 1 if attribute.endswith("visibility") else 0
+    def select(self, name, **kwargs):
+        self.selection = list(self.sets[name])
+    def ls(self, *args, **kwargs):
+        if kwargs.get("selection"):
+            return list(self.selection)
+        if kwargs.get("sets"):
+            return list(self.sets)
+        if kwargs.get("type") or kwargs.get("intermediateObjects") or kwargs.get("instances") or kwargs.get("shapes"):
+            return []
+        return list(args[0]) if args else []
+    def listHistory(self, nodes, **kwargs):
+        return []
+    def listRelatives(self, nodes, **kwargs):
+        return []
+    def keyframe(self, curves, **kwargs):
+        return []
+
+    def AbcExport(self, j):
+        jobs = j if isinstance(j, list) else [j]
+        self.calls.append(jobs)
+        for job in jobs:
+            output = job.split('-file "')[1].rstrip('"')
+            with open(output, "w") as abc_file:
+                abc_file.write(job)
+        if any(name in job for job in jobs for name in self.fail):
+            raise RuntimeError("AbcExport failed")
@@ -0,0 +1,44 @@
+import gw_alembic_batch as batch
+import gw_alembic_core as core
+from stub_cmds import StubCmds
+
+def test_worker_shares_round_robin():
+    scenes = ["a.ma", "b.ma", "c.ma", "d.ma", "e.ma"]
+    assert batch.getWorkerShares(scenes, 2) == [["a.ma", "c.ma", "e.ma"], ["b.ma", "d.ma"]]
+    assert batch.getWorkerShares(scenes[:2], 8) == [["a.ma"], ["b.ma"]]
+
+def test_worker_command_has_all_the_scenes_of_the_share():
+    args = batch.parseArguments(["-w", "2", "--profile", "preview", "--force", "a.ma", "b.ma"])
+    command = batch.buildWorkerCommand(["a.ma", "b.ma"], args)
+    assert command[-2:] == ["a.ma", "b.ma"]
+    assert "--worker" in command and "--force" in command
+    assert command[command.index("--profile")+1] == "preview"
+
+def test_run_batch_one_launch_per_worker():
+    args = batch.parseArguments(["-w", "2", "a.ma", "b.ma", "c.ma"])
+    launched = []
+    reported = []
+    def launcher(scenes, args, report):
+        launched.append(scenes)
+        results = []
+        for scene in scenes:
+            result = {"scene": scene, "sets": ["charA:geo_set"], "failed": [], "error": None if scene != "b.ma" else "broken"}
+            report(dict(result, status="done"))
+            results.append(result)
+        return results
+    results = batch.runBatch(args.scenes, args, launcher, report=reported.append)
+    assert [result["scene"] for result in results] == ["a.ma", "b.ma", "c.ma"]
+    assert [result["error"] for result in results] == [None, "broken", None]
+    assert sorted(launched) == [["a.ma", "c.ma"], ["b.ma"]]
+    assert len(reported) == 3
+
+def test_export_scene_with_stub(tmp_path, monkeypatch):
+    stub = StubCmds({"charA:geo_set": ["|charA:root"], "charB:geo_set": ["|charB:root"], "props_set": ["|props"]})
+    monkeypatch.setattr(core, "cmds", stub)
+    monkeypatch.setattr(core, "getUserSets", lambda use_cache=True: list(stub.sets))
+    result = batch.exportScene("/proj/scenes/shot.ma", ["*:geo_set"], str(tmp_path), "test", {"export_only_visible": False})
+    assert result["error"] is None
+    assert result["sets"] == ["charA:geo_set", "charB:geo_set"]
+    assert result["failed"] == []
+    assert (tmp_path/"charA.abc").exists() and (tmp_path/"charB"/"charB_v001.abc").exists()
+    assert len(stub.calls) == 1 # one AbcExport pass for both sets
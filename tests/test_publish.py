@@ -0,0 +1,41 @@
+import gw_alembic_core as core
+from stub_cmds import StubCmds
+
+def test_static_latest_retired_by_an_export_without_static(tmp_path, monkeypatch):
+    stub = StubCmds({"charA:geo_set": ["|charA:root", "|charA:prop"]})
+    monkeypatch.setattr(core, "cmds", stub)
+    monkeypatch.setattr(core, "classifyMembers", lambda roots, start, end, samples=0:
+                        dict((root, "static" if root.endswith("prop") else "deforming") for root in roots))
+    core.exportSets(["charA:geo_set"], str(tmp_path), export_only_visible=False, static_once=True) # prop in charA_static.abc
+    assert (tmp_path/"charA_static.abc").exists()
+    core.exportSets(["charA:geo_set"], str(tmp_path), export_only_visible=False) # prop back in charA.abc
+    assert "|charA:prop" in (tmp_path/"charA.abc").read_text()
+    assert not (tmp_path/"charA_static.abc").exists()
+    assert (tmp_path/"charA"/"charA_v001_static.abc").exists() # the version stays
+    assert "Replaces latest   :"+str(tmp_path/"charA_static.abc") in (tmp_path/"charA"/"charA.log").read_text()
+
+def test_publish_retry_counts_the_bytes_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "cmds", StubCmds({"charA:geo_set": ["|charA:root"]}))
+    publishAlembic = core.publishAlembic
+    failures = []
+    def failOnce(version_name, save_name):
+        if not failures:
+            failures.append(save_name)
+            raise OSError("share busy")
+        return publishAlembic(version_name, save_name)
+    monkeypatch.setattr(core, "publishAlembic", failOnce)
+    scratch = str(tmp_path/"scratch")
+    publisher = core.getPublisher(scratch, retry_delay=0)
+    core.exportSets(["charA:geo_set"], str(tmp_path/"exports"), export_only_visible=False, scratch_directory=scratch)
+    publisher.wait()
+    status = publisher.status()[0]
+    size = (tmp_path/"exports"/"charA"/"charA_v001.abc").stat().st_size
+    assert status["state"] == "done" and status["attempts"] == 2
+    assert status["bytes"] == size
+    assert core.getLatestCache(str(tmp_path/"exports"), "charA")["size"] == size
+
+def test_catalog_hash_without_dedupe(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "cmds", StubCmds({"charA:geo_set": ["|charA:root"]}))
+    core.exportSets(["charA:geo_set"], str(tmp_path), export_only_visible=False, dedupe=False)
+    assert not (tmp_path/core.store_directory_name).exists()
+    assert core.getLatestCache(str(tmp_path), "charA")["sha256"] == core.getFileHash(str(tmp_path/"charA"/"charA_v001.abc"))
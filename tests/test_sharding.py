@@ -0,0 +1,85 @@
+import contextlib
+import json
+
+import gw_alembic_batch as batch
+import gw_alembic_core as core
+from stub_cmds import StubCmds
+
+def test_split_frame_range_covers_the_range():
+    ranges = core.splitFrameRange(1, 100, 3, handles=2)
+    assert [chunk["frames"] for chunk in ranges] == [[1, 34], [35, 67], [68, 100]]
+    assert [chunk["written"] for chunk in ranges] == [[1, 36], [33, 69], [66, 100]]
+    assert len(core.splitFrameRange(1, 3, 8)) == 3 # never more chunks than frames
+
+def test_split_frame_range_on_the_step():
+    ranges = core.splitFrameRange(1, 10, 3, handles=1, step=2)
+    sampled = [frame for chunk in ranges for frame in range(chunk["frames"][0], chunk["frames"][1]+1, 2)]
+    assert sampled == [1, 3, 5, 7, 9] # the frames of one export with -step 2
+    assert all((chunk["written"][0]-1) % 2 == 0 for chunk in ranges)
+
+def test_chunk_manifest(tmp_path):
+    ranges = core.splitFrameRange(1001, 1010, 2)
+    chunk_files = [core.getChunkFileName(str(tmp_path/"charA_v003.abc"), chunk["chunk"]) for chunk in ranges]
+    manifest_name = str(tmp_path/"charA_v003.manifest.json")
+    core.writeChunkManifest(manifest_name, "charA:geo_set", "v003", ranges, chunk_files, 1001, 1010, "film", 0, "/proj/scenes/shot.ma")
+    with open(manifest_name) as manifest_file:
+        manifest = json.load(manifest_file)
+    assert manifest["frame_range"] == [1001, 1010]
+    assert [chunk["file"] for chunk in manifest["chunks"]] == ["charA_v003_chunk01.abc", "charA_v003_chunk02.abc"]
+    assert [chunk["frames"] for chunk in manifest["chunks"]] == [[1001, 1005], [1006, 1010]]
+
+def exportSharded(stub, exports, monkeypatch, **options):
+    monkeypatch.setattr(core, "cmds", stub)
+    def launcher(scene, chunk, chunk_jobs, report):
+        return batch.runChunkJobs(chunk_jobs)
+    return batch.exportSetsSharded(["charA:geo_set", "charB:geo_set"], exports, 3, 1, launcher=launcher,
+                                   report=lambda message: None, export_only_visible=False, **options)
+
+def test_export_sets_sharded(tmp_path, monkeypatch):
+    stub = StubCmds({"charA:geo_set": ["|charA:root"], "charB:geo_set": ["|charB:root"]}, 1001, 1030)
+    (tmp_path/"charA.abc").write_text("latest of an earlier export")
+    assert exportSharded(stub, str(tmp_path), monkeypatch) == []
+    with open(str(tmp_path/"charA.manifest.json")) as manifest_file:
+        manifest = json.load(manifest_file)
+    assert len(manifest["chunks"]) == 3
+    assert all((tmp_path/"charA"/chunk["file"]).exists() for chunk in manifest["chunks"])
+    assert not (tmp_path/"charA.abc").exists() # the manifest is the latest now
+    assert len(stub.calls) == 3 # one AbcExport call per chunk, both sets in it
+    assert all(chunk["sha256"] == core.getFileHash(str(tmp_path/"charA"/chunk["file"])) for chunk in manifest["chunks"])
+    assert core.getLatestCache(str(tmp_path), "charA")["sha256"] == core.getFileHash(str(tmp_path/"charA.manifest.json"))
+
+def test_export_sets_sharded_failed_chunk(tmp_path, monkeypatch):
+    stub = StubCmds({"charA:geo_set": ["|charA:root"], "charB:geo_set": ["|charB:root"]}, 1001, 1030, fail=["charB_v001_chunk02"])
+    assert exportSharded(stub, str(tmp_path), monkeypatch) == ["charB:geo_set"]
+    assert (tmp_path/"charA.manifest.json").exists()
+    assert not (tmp_path/"charB.manifest.json").exists()
+    assert not list((tmp_path/"charB").glob("*.abc")) # no chunk left behind
+
+def test_export_sets_sharded_reuse_publishes_the_version(tmp_path, monkeypatch):
+    stub = StubCmds({"charA:geo_set": ["|charA:root"], "charB:geo_set": ["|charB:root"]}, 1, 10)
+    monkeypatch.setattr(core, "cmds", stub)
+    core.exportSets(["charA:geo_set"], str(tmp_path), export_only_visible=False) # v001, not sharded
+    stub.end = 20
+    exportSharded(stub, str(tmp_path), monkeypatch) # v002, frames 1-20
+    stub.end = 10
+    exportSharded(stub, str(tmp_path), monkeypatch) # v003: v001 is not a sharded export
+    with open(str(tmp_path/"charA.manifest.json")) as manifest_file:
+        assert json.load(manifest_file)["frame_range"] == [1, 10]
+    (tmp_path/"charA.manifest.json").unlink()
+    calls = len(stub.calls)
+    assert exportSharded(stub, str(tmp_path), monkeypatch) == []
+    assert len(stub.calls) == calls # nothing exported, v003 reused
+    with open(str(tmp_path/"charA.manifest.json")) as manifest_file:
+        assert json.load(manifest_file)["version"] == "v003" # and published again
+    assert not (tmp_path/"charA.abc").exists()
+
+def test_export_sets_sharded_runs_the_export_hooks(tmp_path, monkeypatch):
+    stub = StubCmds({"charA:geo_set": ["|charA:root"], "charB:geo_set": ["|charB:root"]}, 1, 10)
+    entered = []
+    @contextlib.contextmanager
+    def hook(jobs):
+        entered.append([job["set"] for job in jobs])
+        yield
+    monkeypatch.setattr(core, "export_hooks", [hook])
+    exportSharded(stub, str(tmp_path), monkeypatch)
+    assert entered == [["charA:geo_set", "charB:geo_set"]]
@@ -0,0 +1,29 @@
+import os
+import time
+
+import gw_alembic_core as core
+import gw_alembic_store as store
+from stub_cmds import StubCmds
+
+class SameContentCmds(StubCmds):
+    def AbcExport(self, j):
+        for job in (j if isinstance(j, list) else [j]):
+            with open(job.split('-file "')[1].rstrip('"'), "w") as abc_file:
+                abc_file.write("same content")
+
+def test_retention_age_from_the_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, "cmds", SameContentCmds({"charA:geo_set": ["|charA:root"]}))
+    folder = str(tmp_path/"charA")
+    core.exportSets(["charA:geo_set"], str(tmp_path), export_only_visible=False) # v001
+    old = time.time()-60*86400
+    log_name = os.path.join(folder, "charA.log")
+    with open(log_name) as log_file:
+        log = log_file.read()
+    with open(log_name, "w") as log_file:
+        log_file.write(log.replace(time.strftime("%Y-%m-%d"), time.strftime("%Y-%m-%d", time.localtime(old))))
+    os.utime(os.path.join(folder, "charA_v001.abc"), (old, old))
+    core.exportSets(["charA:geo_set"], str(tmp_path), export_only_visible=False, force=True) # v002, a link of the v001 object
+    assert os.path.getmtime(os.path.join(folder, "charA_v002.abc")) == old
+    keep, delete = store.planRetention(folder, keep_last=0, keep_days=30)
+    assert "younger than 30 days" in keep["v002"]
+    assert delete == ["v001"]